@@ -0,0 +1,108 @@
+"""
+Crash-safe file writes shared by the scrapers and the merger.
+Outputs are written to a temporary file in the target's directory,
+fsynced and renamed over the target, so a reader (or the deployed site)
+sees either the old or the new file, never a truncated one - also when
+a run is killed mid-write. Read-modify-write sections hold an advisory
+lock (under .locks/) so overlapping runs apply their updates one after
+the other instead of interleaving.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: writes stay atomic, locking is skipped
+    fcntl = None
+
+LOCK_DIR = '.locks'
+
+# Flush writes to disk before the rename; the benchmarks turn this off to time
+# the pipeline rather than the disk (circular_store follows it for SQLite)
+SYNC = True
+
+
+def _fsync_directory(directory):
+    """Persist the rename itself; not supported everywhere, so best effort"""
+    if not SYNC:
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, payload):
+    """Replace path with payload (bytes or str) via temp file, fsync and rename"""
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            if SYNC:
+                os.fsync(f.fileno())
+        # mkstemp creates 0600 files; keep the usual permissions for published files
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        # Also on SIGTERM/KeyboardInterrupt: never leave temp files behind
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(directory)
+    return len(payload)
+
+
+def write_json(path, data, indent=2, compact=False):
+    """Atomically write data as UTF-8 JSON; returns the size in bytes"""
+    if compact:
+        text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    else:
+        text = json.dumps(data, ensure_ascii=False, indent=indent)
+    return atomic_write(path, text)
+
+
+def lock_path(path):
+    """Lock file for path, kept out of the published directories"""
+    digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(LOCK_DIR, f"{os.path.basename(path)}-{digest}.lock")
+
+
+@contextmanager
+def file_lock(path, timeout=300, poll=0.2):
+    """Exclusive advisory lock on path for the block, waiting up to timeout seconds"""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    with open(lock_path(path), 'a') as lock:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"{path} is locked by another run")
+                time.sleep(poll)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark the table row extraction backends on saved DTE listing pages.
+
+    python benchmarks/bench_parsers.py            # time all backends
+    python benchmarks/bench_parsers.py --record   # refresh pages from the live site
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from row_parsers import ROW_PARSERS, get_row_parser  # noqa: E402
+from sources import SOURCES  # noqa: E402
+from validation import CircularValidator  # noqa: E402
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+LIVE_PAGES = {source.key: source.url for source in SOURCES}
+
+
+is_blocked_href = CircularValidator().is_blocked_href
+
+
+def record_pages():
+    """Save the current live listing pages as benchmark input"""
+    import requests
+    import urllib3
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    os.makedirs(PAGES_DIR, exist_ok=True)
+    for name, url in LIVE_PAGES.items():
+        try:
+            response = requests.get(url, timeout=(20, 90), verify=False)
+            response.raise_for_status()
+            with open(os.path.join(PAGES_DIR, f"{name}.html"), 'wb') as f:
+                f.write(response.content)
+            print(f"Recorded {name}: {len(response.content)} bytes")
+        except Exception as e:
+            print(f"Could not record {name}: {e}")
+
+
+def measure(parser, content, repeat):
+    """Best wall time over repeat runs and peak traced memory of one run"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = list(parser.iter_rows(content, is_blocked_href))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    for _ in parser.iter_rows(content, is_blocked_href):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, best, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--record', action='store_true', help='download fresh pages before benchmarking')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    if args.record:
+        record_pages()
+
+    pages = sorted(glob.glob(os.path.join(PAGES_DIR, '*.html')))
+    if not pages:
+        print(f"No pages in {PAGES_DIR}, run with --record first")
+        return 1
+
+    backends = [get_row_parser(name) for name in ROW_PARSERS]
+    print(f"{'page':<14}{'backend':<11}{'rows':>6}{'time (ms)':>12}{'peak (KB)':>12}{'speedup':>9}")
+    for path in pages:
+        with open(path, 'rb') as f:
+            content = f.read()
+        name = os.path.splitext(os.path.basename(path))[0]
+        reference = None
+        for backend in backends:
+            rows, best, peak = measure(backend, content, args.repeat)
+            if reference is None:
+                reference = (rows, best)
+            match = '' if rows == reference[0] else '  (rows differ from soup)'
+            print(f"{name:<14}{backend.name:<11}{len(rows):>6}{best * 1000:>12.2f}"
+                  f"{peak / 1024:>12.0f}{reference[1] / best:>8.1f}x{match}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks of the scrape and merge pipeline, compared to a stored baseline.
+
+Listing parsing runs on the recorded pages in benchmarks/pages/ (one per
+DTE layout, refreshed with bench_parsers.py --record); validation, merge,
+save_to_json, DataMerger.merge_data (full and --stream) and the search
+index build run on synthetic archives of 1k, 10k and 100k circulars derived from
+circulars-baseline.json, each in a scratch directory so nothing in the
+checkout is touched.
+
+    python benchmarks/bench_pipeline.py                    # compare to baseline.json, exit 1 on regression
+    python benchmarks/bench_pipeline.py --sizes 1000       # quick run on the small archive only
+    python benchmarks/bench_pipeline.py --update-baseline  # store the current timings
+
+Timings are scaled by a fixed calibration loop so a baseline recorded on
+one machine stays usable on a slower or faster one. That loop is CPU-only,
+so fsync is turned off for the runs: disk flush latency varies far more
+between machines (and runs) than the calibration could correct for.
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import atomic_io  # noqa: E402
+from circular_store import CircularStore  # noqa: E402
+from dates import date_iso, sort_key  # noqa: E402
+from merge_data import DataMerger  # noqa: E402
+from scraper import CircularScraper  # noqa: E402
+from search_index import write_search_index  # noqa: E402
+from sources import SOURCES, source_key_for  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PAGES_DIR = os.path.join(BENCH_DIR, 'pages')
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline.json')
+SEED_FILE = os.path.join(ROOT, 'circulars-baseline.json')
+
+SIZES = (1000, 10000, 100000)
+
+# A case regresses when it is this much slower than the (calibrated) baseline,
+# plus a small absolute allowance so sub-millisecond cases do not flap
+TOLERANCE = 0.5
+SLACK_MS = 5.0
+
+# Fresh records per merge, about one scrape of all four sources
+BATCH_SIZE = 100
+
+
+def calibrate():
+    """Milliseconds for a fixed pure-Python workload, the unit timings are scaled by"""
+    best = None
+    for _ in range(5):
+        started = time.perf_counter()
+        total = 0
+        for i in range(200000):
+            total += len(str(i * 7))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def synthetic_archive(size):
+    """size distinct circulars cycled from the baseline, each cycle dated one week earlier"""
+    with open(SEED_FILE, 'r', encoding='utf-8') as f:
+        seed = json.load(f)['circulars']
+    circulars = []
+    for i in range(size):
+        cycle, template = divmod(i, len(seed))
+        circular = dict(seed[template])
+        if cycle:
+            try:
+                date = datetime.strptime(circular['date'], '%d-%m-%Y') - timedelta(weeks=cycle)
+                circular['date'] = date.strftime('%d-%m-%Y')
+            except ValueError:
+                pass
+            circular['circular_no'] = f"{circular['circular_no']}/{cycle}"
+        circular['date_iso'] = date_iso(circular['date'])
+        circulars.append(circular)
+    return circulars
+
+
+def fresh_batch(size=BATCH_SIZE):
+    """New circulars not in any synthetic archive, as a scrape would return them"""
+    now = datetime.now()
+    batch = []
+    for circular in synthetic_archive(size):
+        circular = dict(circular, circular_no=f"{circular['circular_no']}/new",
+                        date=now.strftime('%d-%m-%Y'), scraped_at=now.isoformat())
+        circular['date_iso'] = date_iso(circular['date'])
+        batch.append(circular)
+    return batch
+
+
+class Workspace:
+    """Scratch directories holding a prepared archive, one copy per timed run"""
+
+    def __init__(self, archive):
+        self.root = tempfile.mkdtemp(prefix='dte-bench-')
+        self.template = os.path.join(self.root, 'template')
+        os.makedirs(self.template)
+        # Newest first, as every published circulars.json is
+        data = {'last_updated': datetime.now().isoformat(), 'total_circulars': len(archive),
+                'circulars': sorted(archive, key=sort_key, reverse=True), 'scraping_status': 'success'}
+        with open(os.path.join(self.template, 'circulars.json'), 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        shutil.copy(SEED_FILE, self.template)
+        store = CircularStore(os.path.join(self.template, 'circulars.db'))
+        store.upsert(archive)
+        store.close()
+        self.runs = 0
+
+    def copy(self):
+        self.runs += 1
+        target = os.path.join(self.root, f"run-{self.runs}")
+        shutil.copytree(self.template, target)
+        return target
+
+    def close(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def quiet_in(directory):
+    """Run with directory as cwd and the pipeline's progress output swallowed"""
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        os.chdir(cwd)
+
+
+def time_best(run, repeat, setup=None):
+    """Best wall time in ms of run(state) over repeat runs; setup() is not timed"""
+    best = None
+    for _ in range(repeat):
+        state = setup() if setup else None
+        started = time.perf_counter()
+        run(state)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def bench_parsing(repeat):
+    """scrape_circulars parsing of each recorded listing page"""
+    results = {}
+    for path in sorted(glob.glob(os.path.join(PAGES_DIR, '*.html'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        source = next((source for source in SOURCES if source.key == name), None)
+        if source is None:
+            continue
+        with open(path, 'rb') as f:
+            content = f.read()
+        scraper = CircularScraper()
+        results[f"parse/{name}"] = time_best(lambda _: scraper.extract_circulars(source.url, content), repeat)
+    return results
+
+
+def bench_archive(size, repeat):
+    """Validation, merge, save_to_json, both DataMerger modes and the search index over an archive of size circulars"""
+    results = {}
+    archive = synthetic_archive(size)
+    batch = fresh_batch()
+
+    scraper = CircularScraper()
+
+    def validate(_):
+        for circular in archive:
+            scraper.is_valid_circular(circular['date'], circular['circular_no'],
+                                      circular['description'], circular['download_link'])
+    results[f"is_valid_circular/{size}"] = time_best(validate, repeat)
+
+    workspace = Workspace(archive)
+    try:
+        def merge(directory):
+            with quiet_in(directory):
+                scraper = CircularScraper()
+                scraper.merge_with_existing_data(batch)
+                scraper.store.close()
+        results[f"merge_with_existing_data/{size}"] = time_best(merge, repeat, workspace.copy)
+
+        def save(directory):
+            with quiet_in(directory):
+                scraper = CircularScraper()
+                scraper.save_to_json(batch)
+                scraper.store.close()
+        results[f"save_to_json/{size}"] = time_best(save, repeat, workspace.copy)
+
+        def prepare_merge():
+            # The micro-scraper outputs DataMerger reads, with the batch as fresh data
+            directory = workspace.copy()
+            scraped_at = datetime.now().isoformat()
+            for source in SOURCES:
+                circulars = [c for c in batch if source_key_for(c) == source.key]
+                with open(os.path.join(directory, f"data_{source.key}.json"), 'w', encoding='utf-8') as f:
+                    json.dump({'source': source.name, 'url': source.url, 'scraped_at': scraped_at,
+                               'count': len(circulars), 'circulars': circulars}, f, ensure_ascii=False)
+            return directory
+
+        def merge_data(directory):
+            with quiet_in(directory):
+                DataMerger().merge_data()
+        results[f"DataMerger.merge_data/{size}"] = time_best(merge_data, repeat, prepare_merge)
+
+        def stream_data(directory):
+            with quiet_in(directory):
+                DataMerger().merge_data(streaming=True)
+        results[f"DataMerger.merge_data(stream)/{size}"] = time_best(stream_data, repeat, prepare_merge)
+
+        # Whole-archive index with the newest 400 referenced in their shards, as a full merge builds it
+        newest = sorted(archive, key=sort_key, reverse=True)
+
+        def search_index(directory):
+            with quiet_in(directory):
+                write_search_index(newest, newest[:400])
+        results[f"write_search_index/{size}"] = time_best(search_index, repeat, workspace.copy)
+    finally:
+        workspace.close()
+    return results
+
+
+def load_baseline():
+    try:
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def compare(results, calibration, baseline, tolerance):
+    """Print each case against the baseline; returns the names of regressed cases"""
+    scale = calibration / baseline['calibration_ms'] if baseline else 1.0
+    regressions = []
+    print(f"{'case':<40}{'time (ms)':>12}{'baseline':>12}{'change':>9}")
+    for name, elapsed in results.items():
+        reference = baseline['cases'].get(name) if baseline else None
+        if reference is None:
+            print(f"{name:<40}{elapsed:>12.2f}{'-':>12}{'new':>9}")
+            continue
+        expected = reference * scale
+        change = (elapsed - expected) / expected * 100 if expected else 0
+        flag = ''
+        if elapsed > expected * (1 + tolerance) + SLACK_MS:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<40}{elapsed:>12.2f}{expected:>12.2f}{change:>+8.0f}%{flag}")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES), help='synthetic archive sizes')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='runs per case, the best one counts')
+    arg_parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='allowed slowdown, 0.5 = 50%%')
+    arg_parser.add_argument('--update-baseline', action='store_true', help='write the timings to baseline.json')
+    args = arg_parser.parse_args()
+
+    if not os.path.exists(SEED_FILE):
+        print(f"{SEED_FILE} is missing, it seeds the synthetic archives")
+        return 1
+
+    # Time the pipeline's own work, not the disk's (see the module docstring)
+    atomic_io.SYNC = False
+    calibration = calibrate()
+    print(f"Calibration: {calibration:.1f} ms (Python {platform.python_version()})")
+
+    results = bench_parsing(args.repeat)
+    for size in args.sizes:
+        # The largest archives take seconds per case; one run is stable enough there
+        results.update(bench_archive(size, 1 if size >= 100000 else args.repeat))
+
+    baseline = load_baseline()
+    if args.update_baseline:
+        cases = dict(baseline['cases']) if baseline else {}
+        if baseline:
+            # Keep cases not run this time, rescaled to the new calibration
+            scale = calibration / baseline['calibration_ms']
+            cases = {name: round(value * scale, 3) for name, value in cases.items()}
+        cases.update({name: round(value, 3) for name, value in results.items()})
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'recorded_at': datetime.now().isoformat(), 'python': platform.python_version(),
+                       'calibration_ms': round(calibration, 3), 'cases': dict(sorted(cases.items()))},
+                      f, indent=2)
+            f.write('\n')
+        compare(results, calibration, None, args.tolerance)
+        print(f"Baseline written to {BASELINE_FILE}")
+        return 0
+
+    if baseline is None:
+        print(f"No baseline at {BASELINE_FILE}, run with --update-baseline first")
+        compare(results, calibration, None, args.tolerance)
+        return 0
+
+    regressions = compare(results, calibration, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than the baseline allows: {', '.join(regressions)}")
+        return 1
+    print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
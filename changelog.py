@@ -0,0 +1,222 @@
+"""
+Delta log and feeds of the published circulars window.
+Every merge that changes the window gets the next sequence number and a
+changes/<seq>.json holding the added records and removed keys, so
+consumers can poll changes/index.json and fetch only the deltas after
+the last seq they saw. Keys are store keys; when their normalization
+changes (KEY_VERSION) the log restarts from a new baseline seq instead of
+reporting every circular as removed and re-added, and clients behind that
+seq reload circulars.json. feed.json (JSON Feed) and feed.xml (Atom) carry
+the newest entries for feed readers.
+"""
+
+import io
+import json
+import os
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+
+from atomic_io import atomic_write, write_json
+from circular_store import store_key
+from dates import sort_key
+from dedup import KEY_VERSION
+from sources import DTE_BASE_URL, SOURCES_BY_KEY, source_key_for
+
+CHANGES_DIR = 'changes'
+STATE_FILE = 'state.json'
+INDEX_FILE = 'index.json'
+
+# Deltas older than this many merges are dropped; clients further behind reload circulars.json
+MAX_DELTAS = 500
+
+FEED_TITLE = 'DTE Karnataka Circulars'
+FEED_ID = 'urn:dtek-circulars:feed'
+FEED_SIZE = 50
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+
+# Absolute URL of the published site, used for feed self links when set
+SITE_URL = os.getenv('SITE_URL', '').rstrip('/')
+
+
+class ChangeLog:
+    def __init__(self, directory=CHANGES_DIR, max_deltas=MAX_DELTAS):
+        self.directory = directory
+        self.max_deltas = max_deltas
+        self.state_file = os.path.join(directory, STATE_FILE)
+        self.index_file = os.path.join(directory, INDEX_FILE)
+
+    def _load(self, path, default):
+        try:
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Could not load {path}: {e}")
+        return default
+
+    def _write(self, path, data, indent=None):
+        write_json(path, data, indent=indent, compact=not indent)
+
+    def record(self, circulars, fresh_circulars=()):
+        """Diff the window against the last recorded one; returns the new delta or None"""
+        os.makedirs(self.directory, exist_ok=True)
+        state = self._load(self.state_file, None)
+        index = self._load(self.index_file, {'latest_seq': 0, 'changes': []})
+
+        current = {}
+        for circular in circulars:
+            key = store_key(circular)
+            if key is not None and key not in current:
+                current[key] = circular
+
+        if state is None:
+            # First run: the current window is the starting point, not a change
+            self._baseline(0, current, index)
+            print(f"Change log started at seq 0 with {len(current)} circulars")
+            return None
+        if state.get('key_version', 1) != KEY_VERSION:
+            # Keys from an older normalization cannot be compared with the current ones
+            seq = state['seq'] + 1
+            self._prune(index, keep=0)
+            self._baseline(seq, current, index)
+            print(f"Change log restarted at seq {seq} for key version {KEY_VERSION}, "
+                  f"{len(current)} circulars")
+            return None
+
+        previous = set(state.get('keys', []))
+        added = [key for key in current if key not in previous]
+        removed = sorted(previous - current.keys())
+        if not added and not removed:
+            print(f"Change log: no changes since seq {state['seq']}")
+            return None
+
+        fresh_keys = {store_key(c) for c in fresh_circulars}
+        seq = state['seq'] + 1
+        now = datetime.now().isoformat()
+        delta = {
+            'seq': seq,
+            'previous_seq': state['seq'],
+            'generated_at': now,
+            'added': [{'key': key, 'origin': 'fresh' if key in fresh_keys else 'archive',
+                       'circular': current[key]} for key in added],
+            'removed': removed,
+        }
+        filename = f"{seq}.json"
+        self._write(os.path.join(self.directory, filename), delta)
+
+        index['latest_seq'] = seq
+        index['changes'].append({'seq': seq, 'generated_at': now, 'file': filename,
+                                 'added': len(added), 'removed': len(removed)})
+        self._prune(index)
+        self._write_index(index)
+        self._write_state(seq, current)
+
+        print(f"Change log seq {seq}: {len(added)} added, {len(removed)} removed")
+        return delta
+
+    def _write_state(self, seq, current):
+        self._write(self.state_file, {'seq': seq, 'key_version': KEY_VERSION, 'keys': sorted(current)})
+
+    def _baseline(self, seq, current, index):
+        """Make the current window the state at seq without a delta; older seqs must reload"""
+        index['latest_seq'] = seq
+        index['baseline_seq'] = seq
+        self._write_index(index)
+        self._write_state(seq, current)
+
+    def _prune(self, index, keep=None):
+        keep = self.max_deltas if keep is None else keep
+        while len(index['changes']) > keep:
+            entry = index['changes'].pop(0)
+            try:
+                os.remove(os.path.join(self.directory, entry['file']))
+            except OSError:
+                pass
+
+    def _write_index(self, index):
+        changes = index['changes']
+        index['oldest_seq'] = changes[0]['seq'] if changes else index['latest_seq']
+        index['updated_at'] = datetime.now().isoformat()
+        self._write(self.index_file, index, indent=2)
+
+    def since(self, seq):
+        """Deltas after seq, oldest first; None if seq is older than the retained log or the baseline"""
+        index = self._load(self.index_file, {'latest_seq': 0, 'changes': []})
+        changes = index['changes']
+        if seq < index.get('baseline_seq', 0) or (changes and seq < changes[0]['seq'] - 1):
+            return None
+        return [self._load(os.path.join(self.directory, entry['file']), {})
+                for entry in changes if entry['seq'] > seq]
+
+
+def rfc3339(value):
+    """RFC 3339 timestamp for an ISO string or datetime, naive values taken as UTC"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.isoformat()
+
+
+def _feed_item(circular):
+    key = store_key(circular)
+    source = SOURCES_BY_KEY.get(source_key_for(circular))
+    published = sort_key(circular)
+    title = circular.get('description') or circular.get('circular_no') or 'Circular'
+    summary = ' | '.join(part for part in (
+        circular.get('date'), circular.get('circular_no'), source.name if source else None) if part)
+    return {
+        'id': f"urn:dtek-circular:{key}",
+        'url': circular.get('download_link') or circular.get('source_url') or DTE_BASE_URL,
+        'title': title,
+        'summary': summary,
+        'published': rfc3339(published) if published else None,
+        'tags': [source.name] if source else [],
+    }
+
+
+def write_feeds(data, json_file='feed.json', atom_file='feed.xml', size=FEED_SIZE):
+    """JSON Feed 1.1 and Atom files with the newest circulars of the window"""
+    items = [_feed_item(c) for c in data.get('circulars', [])[:size] if store_key(c)]
+    updated = rfc3339(data.get('last_updated') or datetime.now())
+
+    feed = {
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': FEED_TITLE,
+        'home_page_url': SITE_URL or DTE_BASE_URL,
+        'items': [{
+            'id': item['id'],
+            'url': item['url'],
+            'title': item['title'],
+            'content_text': item['summary'],
+            'date_published': item['published'],
+            'tags': item['tags'],
+        } for item in items],
+    }
+    if SITE_URL:
+        feed['feed_url'] = f"{SITE_URL}/{json_file}"
+    write_json(json_file, feed)
+
+    ET.register_namespace('', ATOM_NS)
+    root = ET.Element(f"{{{ATOM_NS}}}feed")
+    ET.SubElement(root, f"{{{ATOM_NS}}}id").text = FEED_ID
+    ET.SubElement(root, f"{{{ATOM_NS}}}title").text = FEED_TITLE
+    ET.SubElement(root, f"{{{ATOM_NS}}}updated").text = updated
+    ET.SubElement(root, f"{{{ATOM_NS}}}link", href=SITE_URL or DTE_BASE_URL)
+    if SITE_URL:
+        ET.SubElement(root, f"{{{ATOM_NS}}}link", rel='self', href=f"{SITE_URL}/{atom_file}")
+    ET.SubElement(ET.SubElement(root, f"{{{ATOM_NS}}}author"), f"{{{ATOM_NS}}}name").text = 'DTE Karnataka'
+    for item in items:
+        entry = ET.SubElement(root, f"{{{ATOM_NS}}}entry")
+        ET.SubElement(entry, f"{{{ATOM_NS}}}id").text = item['id']
+        ET.SubElement(entry, f"{{{ATOM_NS}}}title").text = item['title']
+        ET.SubElement(entry, f"{{{ATOM_NS}}}link", href=item['url'])
+        ET.SubElement(entry, f"{{{ATOM_NS}}}updated").text = item['published'] or updated
+        ET.SubElement(entry, f"{{{ATOM_NS}}}summary").text = item['summary']
+        for tag in item['tags']:
+            ET.SubElement(entry, f"{{{ATOM_NS}}}category", term=tag)
+    atom = io.BytesIO()
+    ET.ElementTree(root).write(atom, encoding='utf-8', xml_declaration=True)
+    atomic_write(atom_file, atom.getvalue())
+
+    print(f"Wrote {len(items)} entries to {json_file} and {atom_file}")
@@ -0,0 +1,190 @@
+"""
+Embedded SQLite store holding every circular ever scraped.
+Merges are upserts on a unique normalized (circular_no, description) key,
+and circulars.json is exported from the store as a derived artifact, so
+merge cost no longer grows with the size of the history. The key
+normalization version is kept in PRAGMA user_version; older databases
+are re-keyed on open, merging records that now share a key. Each row
+also keeps the content fingerprint of its record, so digest() summarizes
+the whole archive without decoding it.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+import atomic_io
+from dates import date_iso
+from dedup import KEY_VERSION, dedup_key
+from fingerprint import record_fingerprint
+from sources import source_key_for
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS circulars (
+    key TEXT PRIMARY KEY,
+    source TEXT,
+    date_iso TEXT NOT NULL DEFAULT '',
+    batch INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    first_seen TEXT NOT NULL,
+    record TEXT NOT NULL,
+    fingerprint TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_circulars_source_date ON circulars (source, date_iso);
+CREATE INDEX IF NOT EXISTS idx_circulars_date ON circulars (date_iso);
+"""
+
+# Newest first; within a date, the most recent batch and its scrape order win,
+# which matches the old "new + existing, then stable sort" merge
+ORDER = "date_iso DESC, batch DESC, position ASC"
+
+
+def store_key(circular):
+    """Hash of the normalized (circular_no, description) identity, used for the unique index"""
+    return dedup_key(circular)
+
+
+class CircularStore:
+    def __init__(self, path='circulars.db'):
+        self.path = path
+        # Concurrent writers wait for each other's transactions instead of failing
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA synchronous={'NORMAL' if atomic_io.SYNC else 'OFF'}")
+        self.conn.executescript(SCHEMA)
+        self._add_fingerprints()
+        self._rekey()
+
+    def _add_fingerprints(self):
+        """Add the fingerprint column to stores created before it, filling it once"""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(circulars)")]
+        if 'fingerprint' not in columns:
+            self.conn.execute("ALTER TABLE circulars ADD COLUMN fingerprint TEXT")
+        rows = self.conn.execute("SELECT key, record FROM circulars WHERE fingerprint IS NULL").fetchall()
+        if rows:
+            with self.conn:
+                self.conn.executemany("UPDATE circulars SET fingerprint = ? WHERE key = ?",
+                                      [(record_fingerprint(json.loads(record)), key) for key, record in rows])
+
+    def _rekey(self):
+        """Recompute keys written by an older normalization; the newest copy of a merged key wins"""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= KEY_VERSION:
+            return
+        rows = self.conn.execute(
+            "SELECT source, date_iso, batch, position, first_seen, record, fingerprint FROM circulars "
+            "ORDER BY batch DESC, position ASC").fetchall()
+        kept = {}
+        for source, iso, batch, position, first_seen, record, fingerprint in rows:
+            key = store_key(json.loads(record))
+            if key is None:
+                continue
+            if key in kept:
+                # Keep the newest record but remember when the circular was first seen
+                kept[key][5] = min(kept[key][5], first_seen)
+            else:
+                kept[key] = [key, source, iso, batch, position, first_seen, record, fingerprint]
+        with self.conn:
+            self.conn.execute("DELETE FROM circulars")
+            self.conn.executemany(
+                """INSERT INTO circulars (key, source, date_iso, batch, position, first_seen, record, fingerprint)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", kept.values())
+            self.conn.execute(f"PRAGMA user_version = {KEY_VERSION}")
+        if rows:
+            print(f"Re-keyed {self.path} to key version {KEY_VERSION}: "
+                  f"{len(rows) - len(kept)} duplicate circulars merged, {len(kept)} remain")
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM circulars").fetchone()[0]
+
+    def _next_batch(self):
+        return self.conn.execute("SELECT COALESCE(MAX(batch), 0) + 1 FROM circulars").fetchone()[0]
+
+    def _rows(self, circulars, batch):
+        now = datetime.now().isoformat()
+        seen = set()
+        for position, circular in enumerate(circulars):
+            key = store_key(circular)
+            # Within one batch the first occurrence wins, as in the old dedup loops
+            if key is None or key in seen:
+                continue
+            seen.add(key)
+            if 'date_iso' not in circular:
+                circular = dict(circular, date_iso=date_iso(circular.get('date', '')))
+            yield (key, source_key_for(circular), circular['date_iso'], batch, position, now,
+                   json.dumps(circular, ensure_ascii=False), record_fingerprint(circular))
+
+    def upsert(self, circulars):
+        """Insert or replace circulars by key; returns how many keys were new"""
+        before = self.count()
+        with self.conn:
+            self.conn.executemany(
+                """INSERT INTO circulars (key, source, date_iso, batch, position, first_seen, record, fingerprint)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(key) DO UPDATE SET
+                       source = excluded.source, date_iso = excluded.date_iso,
+                       batch = excluded.batch, position = excluded.position,
+                       record = excluded.record, fingerprint = excluded.fingerprint""",
+                self._rows(circulars, self._next_batch()))
+        return self.count() - before
+
+    def insert_missing(self, circulars):
+        """Add circulars whose key is not stored yet, never overwriting; returns how many were added"""
+        before = self.count()
+        with self.conn:
+            # Older data ranks below everything already stored
+            self.conn.executemany(
+                """INSERT OR IGNORE INTO circulars (key, source, date_iso, batch, position, first_seen, record, fingerprint)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                self._rows(circulars, 0))
+        return self.count() - before
+
+    def bootstrap(self, filenames):
+        """Seed an empty store from existing JSON outputs, first file ranks highest"""
+        if self.count():
+            return 0
+        added = 0
+        for filename in reversed(filenames):
+            try:
+                if os.path.exists(filename):
+                    with open(filename, 'r', encoding='utf-8') as f:
+                        added += self.upsert(json.load(f).get('circulars', []))
+            except Exception as e:
+                print(f"Could not seed store from {filename}: {e}")
+        print(f"Seeded {self.path} with {added} circulars")
+        return added
+
+    def recent(self, limit, source=None):
+        """Newest circulars overall, or of one source key, via the indexes"""
+        if source is None:
+            rows = self.conn.execute(f"SELECT record FROM circulars ORDER BY {ORDER} LIMIT ?", (limit,))
+        else:
+            rows = self.conn.execute(
+                f"SELECT record FROM circulars WHERE source = ? ORDER BY {ORDER} LIMIT ?", (source, limit))
+        return [json.loads(record) for (record,) in rows]
+
+    def all(self):
+        """Every stored circular, newest first"""
+        return [json.loads(record) for (record,) in
+                self.conn.execute(f"SELECT record FROM circulars ORDER BY {ORDER}")]
+
+    def digest(self):
+        """SHA-256 over the fingerprints of every stored circular, in any order"""
+        digest = hashlib.sha256()
+        for (fingerprint,) in self.conn.execute("SELECT fingerprint FROM circulars ORDER BY fingerprint"):
+            digest.update(fingerprint.encode('ascii'))
+        return digest.hexdigest()
+
+    def recent_by_source(self, sources, per_source):
+        """Newest per_source circulars of each source key, in registry order"""
+        circulars = []
+        for source in sources:
+            circulars.extend(self.recent(per_source, source))
+        return circulars
+
+    def close(self):
+        # Fold the WAL back into the database file so it can be committed on its own
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.close()
@@ -0,0 +1,57 @@
+"""
+Date normalization for circular dates.
+DTE pages mix DD-MM-YYYY, DD/MM/YYYY, dotted and spaced forms and
+sometimes Kannada digits. Dates are parsed once (cached) and stored as
+an ISO 'date_iso' field that sorting and merging use directly.
+"""
+
+import re
+from datetime import datetime
+from functools import lru_cache
+
+# Fallback for unparseable dates, sorts after every real date
+UNKNOWN_DATE = datetime(1900, 1, 1)
+
+KANNADA_DIGITS = str.maketrans('೦೧೨೩೪೫೬೭೮೯', '0123456789')
+
+MONTHS = {name: number for number, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], start=1)}
+
+_SEPARATORS = re.compile(r'[\s./\-,]+')
+
+
+@lru_cache(maxsize=4096)
+def parse_date(date_str):
+    """datetime for a circular date string, UNKNOWN_DATE if it cannot be parsed"""
+    try:
+        parts = [p for p in _SEPARATORS.split((date_str or '').strip().translate(KANNADA_DIGITS)) if p]
+        if len(parts) != 3:
+            return UNKNOWN_DATE
+
+        if not parts[1].isdigit():
+            # 05 Aug 2025 / 05-August-2025
+            parts[1] = str(MONTHS[parts[1][:3].lower()])
+
+        if len(parts[0]) == 4:
+            # YYYY-MM-DD
+            year, month, day = parts
+        else:
+            # DD-MM-YYYY, DD/MM/YY
+            day, month, year = parts
+            if len(year) == 2:
+                year = '20' + year
+        return datetime(int(year), int(month), int(day))
+    except (KeyError, ValueError):
+        return UNKNOWN_DATE
+
+
+def date_iso(date_str):
+    """'YYYY-MM-DD' for a circular date string, '' if it cannot be parsed"""
+    parsed = parse_date(date_str)
+    return '' if parsed == UNKNOWN_DATE else parsed.strftime('%Y-%m-%d')
+
+
+def sort_key(circular):
+    """Precomputed ISO date of a circular; unknown dates sort last when newest-first"""
+    return circular.get('date_iso') or date_iso(circular.get('date', ''))
+
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Normalized dedup keys and near-duplicate detection for circulars.
+Keys hash circular_no and description after NFKC normalization, removal
+of zero-width joiners, folding of Kannada digits to ASCII, case folding
+and collapsing of punctuation and whitespace, so copies of a circular
+that differ only in how the page typed them share one key.
+
+Near-duplicates (the same circular posted twice with small edits, on the
+same date or with the same file) are found with MinHash signatures and
+LSH banding over their words, so only records that share a band bucket
+are compared and the pass stays sub-quadratic; candidate pairs are
+confirmed on exact character-shingle Jaccard similarity.
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import unicodedata
+from collections import defaultdict
+
+from dates import KANNADA_DIGITS
+from sources import source_key_for
+
+# Bumped when the key normalization changes; CircularStore re-keys older databases
+KEY_VERSION = 2
+
+# ZWNJ/ZWJ change rendering, not meaning; DTE pages use them inconsistently
+ZERO_WIDTH = dict.fromkeys(map(ord, '\u200b\u200c\u200d\u2060\ufeff'))
+
+# Dropped and folded in one pass; dict-based translate is slow, so only run it when needed
+FOLD = {**ZERO_WIDTH, **KANNADA_DIGITS}
+FOLD_CHARS = re.compile('[' + ''.join(map(chr, FOLD)) + ']')
+
+# Anything but letters, digits and Kannada signs (vowel signs and virama are not \w)
+PUNCTUATION = re.compile(r'[^\w\u0C80-\u0CFF]+|_')
+DIGITS = re.compile(r'\d+')
+
+SHINGLE_SIZE = 4
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+
+# Similarity a near-duplicate pair needs on its description and circular number
+THRESHOLD = 0.9
+NUMBER_THRESHOLD = 0.8
+
+# Each bucket member is compared with at most this many later ones, bounding
+# degenerate buckets (one file linked from hundreds of records)
+MAX_BUCKET_SPAN = 32
+
+
+def normalize_key_text(text):
+    """Comparable form of a key field"""
+    text = unicodedata.normalize('NFKC', text or '')
+    if FOLD_CHARS.search(text):
+        text = text.translate(FOLD)
+    text = text.casefold()
+    return ' '.join(PUNCTUATION.sub(' ', text).split())
+
+
+def dedup_key(circular):
+    """SHA-1 of the normalized (circular_no, description), or None if both are empty"""
+    circular_no = normalize_key_text(circular.get('circular_no', ''))
+    description = normalize_key_text(circular.get('description', ''))
+    if not circular_no and not description:
+        return None
+    return hashlib.sha1(f"{circular_no}\x1f{description}".encode('utf-8')).hexdigest()
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+# One xor mask per permutation
+MASKS = [_hash64(f"minhash-{i}") for i in range(NUM_PERM)]
+HASH_BITS = (1 << 64) - 1
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Character shingles of normalized text; short texts are one shingle"""
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def minhash(shingle_set):
+    """Signature of a shingle set; uses hash(), so only comparable within one process"""
+    hashes = [hash(shingle) & HASH_BITS for shingle in shingle_set] or [0]
+    return [min(map(mask.__xor__, hashes)) for mask in MASKS]
+
+
+class _Entry:
+    __slots__ = ('source', 'date', 'link', 'digits', 'circular_no', 'description', '_shingles')
+
+    def __init__(self, circular):
+        circular_no = normalize_key_text(circular.get('circular_no', ''))
+        description = normalize_key_text(circular.get('description', ''))
+        self.source = source_key_for(circular)
+        # Re-issues (same number, new date and file) are distinct documents
+        self.date = circular.get('date_iso') or circular.get('date', '')
+        self.link = circular.get('download_link', '')
+        # Circulars that differ in any number (year, order no.) are never merged
+        self.digits = DIGITS.findall(f"{circular_no} {description}")
+        self.circular_no = circular_no
+        self.description = description
+        self._shingles = None
+
+    def groups(self):
+        """The (source, date) and (source, file) groups a near-duplicate must share"""
+        yield (self.source, 'date', self.date)
+        if self.link:
+            yield (self.source, 'link', self.link)
+
+    def signature(self):
+        # Signed on words (a tenth of the char shingles); pairs are confirmed on the shingles
+        return minhash(set(self.circular_no.split()) | set(self.description.split()))
+
+    def shingles(self):
+        """(circular_no, description) shingle sets, built only for entries in a candidate pair"""
+        if self._shingles is None:
+            self._shingles = (shingles(self.circular_no), shingles(self.description))
+        return self._shingles
+
+
+def near_duplicate_clusters(circulars, threshold=THRESHOLD):
+    """Groups of indices into circulars that are near-duplicates, each sorted, first index first"""
+    entries = [_Entry(circular) for circular in circulars]
+
+    # Pairs must share the source and the date or the file, so those are part of the bucket key;
+    # repeated boilerplate descriptions on different dates then never meet, and records alone
+    # in both of their groups (most of a window) are never signed
+    sizes = defaultdict(int)
+    for entry in entries:
+        for group in entry.groups():
+            sizes[group] += 1
+
+    buckets = defaultdict(list)
+    for index, entry in enumerate(entries):
+        groups = [group for group in entry.groups() if sizes[group] > 1]
+        if not groups:
+            continue
+        signature = entry.signature()
+        for band in range(BANDS):
+            bucket = tuple(signature[band * ROWS:(band + 1) * ROWS])
+            for group in groups:
+                buckets[(band, group, bucket)].append(index)
+
+    parent = list(range(len(entries)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    checked = set()
+    for members in buckets.values():
+        for position, a in enumerate(members):
+            for b in members[position + 1:position + 1 + MAX_BUCKET_SPAN]:
+                if (a, b) in checked or find(a) == find(b):
+                    continue
+                checked.add((a, b))
+                first, second = entries[a], entries[b]
+                if first.digits != second.digits:
+                    continue
+                (first_number, first_text), (second_number, second_text) = first.shingles(), second.shingles()
+                if jaccard(first_text, second_text) >= threshold \
+                        and jaccard(first_number, second_number) >= NUMBER_THRESHOLD:
+                    # The earlier record (newest in store order) stays the root
+                    root_a, root_b = find(a), find(b)
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    clusters = defaultdict(list)
+    for index in range(len(entries)):
+        clusters[find(index)].append(index)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def collapse_near_duplicates(circulars, threshold=THRESHOLD):
+    """Drop near-duplicates, keeping the first of each cluster; returns (kept, clusters)"""
+    clusters = near_duplicate_clusters(circulars, threshold)
+    dropped = set()
+    report = []
+    for members in clusters:
+        dropped.update(members[1:])
+        report.append({
+            'kept': circulars[members[0]],
+            'merged': [circulars[index] for index in members[1:]],
+        })
+    kept = [circular for index, circular in enumerate(circulars) if index not in dropped]
+    return kept, report
+
+
+def describe_clusters(clusters, limit=10):
+    """Printable lines for a near-duplicate report"""
+    lines = []
+    for cluster in clusters[:limit]:
+        kept = cluster['kept']
+        lines.append(f"  - kept {kept.get('date', '')} {kept.get('circular_no', '')[:40]}, merged "
+                     + ', '.join(f"{c.get('date', '')} {c.get('circular_no', '')[:40]}" for c in cluster['merged']))
+    if len(clusters) > limit:
+        lines.append(f"  ... and {len(clusters) - limit} more clusters")
+    return lines
+
+
+def cluster_summary(clusters, limit=50):
+    """Compact form of a report for status.json"""
+    return [{'date': cluster['kept'].get('date', ''),
+             'kept': cluster['kept'].get('circular_no', ''),
+             'merged': [circular.get('circular_no', '') for circular in cluster['merged']]}
+            for cluster in clusters[:limit]]
+
+
+def report_near_duplicates(circulars, label='window'):
+    """collapse_near_duplicates() that prints what it merged; returns (kept, clusters)"""
+    kept, clusters = collapse_near_duplicates(circulars)
+    if clusters:
+        print(f"Near-duplicates in {label}: {len(circulars) - len(kept)} records folded into {len(clusters)} clusters")
+        for line in describe_clusters(clusters):
+            print(line)
+    return kept, clusters
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report near-duplicate circulars in a JSON file or the store')
+    parser.add_argument('filename', nargs='?', default='circulars.db')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    parser.add_argument('--limit', type=int, default=50, help='clusters to list')
+    args = parser.parse_args()
+
+    if args.filename.endswith('.db'):
+        from circular_store import CircularStore  # the store imports this module
+        store = CircularStore(args.filename)
+        circulars = store.all()
+        store.close()
+    else:
+        with open(args.filename, 'r', encoding='utf-8') as f:
+            circulars = json.load(f).get('circulars', [])
+
+    kept, clusters = collapse_near_duplicates(circulars, args.threshold)
+    print(f"{len(circulars)} circulars, {len(clusters)} near-duplicate clusters, "
+          f"{len(circulars) - len(kept)} records would be merged")
+    for line in describe_clusters(clusters, args.limit):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
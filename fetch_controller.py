@@ -0,0 +1,186 @@
+"""
+Per-URL fetch policy shared by the scrapers.
+Response times are kept per listing URL across runs, request timeouts
+are derived from their p50/p95, a circuit opens after consecutive
+failures so a known-down section is skipped at once, and retries follow
+one budget-aware policy instead of urllib3 retries stacked under a retry
+loop. Every section lives on the same host, so state is keyed by the
+full URL: one broken section must not open the circuit for the others.
+Concurrency is still capped per host, since that is what the server sees.
+
+Each process uses one controller and writes its own
+.http_cache/fetch-<name>.json (separate workflows never touch the same
+file) and reads all of them, so the history of a URL is shared between
+scrapers.
+"""
+
+import glob
+import json
+import math
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+from atomic_io import atomic_write
+
+STATE_DIR = '.http_cache'
+
+# Statuses worth retrying; other 4xx responses will not change on a retry
+RETRYABLE_STATUSES = frozenset([429, 500, 502, 503, 504, 520, 521, 522, 523, 524])
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def circuit_key(url):
+    """The URL without its fragment; entries from older per-host state have no scheme"""
+    return url.split('#', 1)[0]
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+class FetchController:
+    def __init__(self, name='scraper', state_dir=STATE_DIR, history_size=50, min_samples=5,
+                 default_timeout=(20, 60), connect_bounds=(5, 30), read_bounds=(15, 120),
+                 failure_threshold=3, cooldown=1800, max_attempts=3, base_delay=2, max_delay=15,
+                 per_host_limit=2):
+        self.state_dir = state_dir
+        self.state_file = os.path.join(state_dir, f"fetch-{name}.json")
+        self.history_size = history_size
+        self.min_samples = min_samples
+        self.default_timeout = default_timeout
+        self.connect_bounds = connect_bounds
+        self.read_bounds = read_bounds
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Below the four sections fetched at once, so the cap binds on the shared host
+        self.per_host_limit = per_host_limit
+
+        self._lock = threading.Lock()
+        self._host_slots = {}
+        # own: what this scraper observed and saves; urls: merged view used for decisions
+        self.own = {key: entry for key, entry in self._read(self.state_file).items() if '://' in key}
+        self.urls = self._merged()
+
+    def _read(self, path):
+        try:
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Could not read fetch state {path}: {e}")
+        return {}
+
+    def _merged(self):
+        urls = {}
+        for path in sorted(glob.glob(os.path.join(self.state_dir, 'fetch-*.json'))):
+            state = self.own if path == self.state_file else self._read(path)
+            for key, entry in state.items():
+                if '://' not in key:
+                    # Per-host entry from before the circuits were per URL
+                    continue
+                merged = urls.setdefault(key, self._new_entry())
+                merged['latencies'].extend(entry.get('latencies', []))
+                merged['failures'] = max(merged['failures'], entry.get('failures', 0))
+                merged['opened_at'] = max(merged['opened_at'] or 0, entry.get('opened_at') or 0) or None
+        for entry in urls.values():
+            entry['latencies'] = entry['latencies'][-self.history_size:]
+        return urls
+
+    @staticmethod
+    def _new_entry():
+        return {'latencies': [], 'failures': 0, 'opened_at': None}
+
+    def _entries(self, url):
+        key = circuit_key(url)
+        return (self.urls.setdefault(key, self._new_entry()),
+                self.own.setdefault(key, self._new_entry()))
+
+    def host_slot(self, url):
+        """Semaphore bounding concurrent requests to url's host; hold it around each request"""
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_slots[host]
+
+    def timeout(self, url, remaining=None):
+        """(connect, read) timeout from the URL's latency history, clipped to the remaining budget"""
+        with self._lock:
+            latencies = list(self._entries(url)[0]['latencies'])
+        if len(latencies) < self.min_samples:
+            connect, read = self.default_timeout
+        else:
+            connect = _clamp(2 * percentile(latencies, 0.5), *self.connect_bounds)
+            read = _clamp(3 * percentile(latencies, 0.95), *self.read_bounds)
+        if remaining is not None:
+            remaining = max(1, remaining)
+            connect, read = min(connect, remaining), min(read, remaining)
+        return (round(connect, 1), round(read, 1))
+
+    def allow(self, url):
+        """False while the URL's circuit is open; after the cooldown one trial request is let through"""
+        with self._lock:
+            entry, own = self._entries(url)
+            if entry['failures'] < self.failure_threshold:
+                return True
+            if entry['opened_at'] and time.time() - entry['opened_at'] >= self.cooldown:
+                # Half-open: restart the cooldown so only this request probes the URL
+                entry['opened_at'] = own['opened_at'] = time.time()
+                return True
+            return False
+
+    def record_success(self, url, seconds):
+        with self._lock:
+            for entry in self._entries(url):
+                entry['latencies'] = (entry['latencies'] + [round(seconds, 3)])[-self.history_size:]
+                entry['failures'] = 0
+                entry['opened_at'] = None
+
+    def record_failure(self, url):
+        with self._lock:
+            entry, own = self._entries(url)
+            entry['failures'] += 1
+            own['failures'] = entry['failures']
+            if entry['failures'] >= self.failure_threshold:
+                entry['opened_at'] = own['opened_at'] = time.time()
+                print(f"Circuit open for {circuit_key(url)} after {entry['failures']} consecutive failures")
+
+    def retry_delay(self, url, attempt, remaining, status=None):
+        """Seconds to wait before another attempt, or None when the policy says stop"""
+        if attempt + 1 >= self.max_attempts:
+            return None
+        if status is not None and status not in RETRYABLE_STATUSES:
+            return None
+        if not self.allow(url):
+            return None
+        # Exponential backoff with jitter, only if the next attempt still fits the budget
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+        if remaining is not None and remaining < delay + self.timeout(url)[0]:
+            return None
+        return delay
+
+    def summary(self):
+        with self._lock:
+            lines = []
+            for key, entry in sorted(self.urls.items()):
+                latencies = entry['latencies']
+                timing = (f"p50 {percentile(latencies, 0.5):.2f}s, p95 {percentile(latencies, 0.95):.2f}s"
+                          if latencies else 'no samples')
+                state = 'open' if entry['failures'] >= self.failure_threshold else 'closed'
+                lines.append(f"{key}: {timing}, {entry['failures']} failures, circuit {state}")
+        return lines
+
+    def save(self):
+        with self._lock:
+            atomic_write(self.state_file, json.dumps(self.own, indent=2, sort_keys=True))
@@ -0,0 +1,57 @@
+"""
+Content fingerprints for change detection.
+A record's fingerprint hashes only its normalized content fields, never
+the scrape or merge timestamps, and the dataset digest combines the
+ordered fingerprints of the published window with the digest of the
+archive store (CircularStore.digest()).
+A merge whose digest matches the last one skips every write, so nothing
+is committed or redeployed; the timestamps that change on every run go
+to the small status.json instead.
+"""
+
+import hashlib
+import json
+import os
+
+from atomic_io import write_json
+from sources import source_key_for
+
+STATUS_FILE = 'status.json'
+
+# Published content of a record; scraped_at and source_url spelling are left out,
+# the freshness tier is in so a section going stale (or recovering) is published
+CONTENT_FIELDS = ('date', 'circular_no', 'description', 'download_link',
+                  'pdf_sha256', 'pdf_pages', 'pdf_excerpt', 'freshness')
+
+
+def record_fingerprint(circular):
+    """SHA-1 of the whitespace-normalized content fields and the source key"""
+    parts = [source_key_for(circular) or '']
+    for field in CONTENT_FIELDS:
+        value = circular.get(field)
+        parts.append('' if value is None else ' '.join(str(value).split()))
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def dataset_digest(circulars, archive_digest=''):
+    """SHA-256 over the published circulars in order, then the archive store's digest"""
+    digest = hashlib.sha256()
+    for circular in circulars:
+        digest.update(record_fingerprint(circular).encode('ascii'))
+    digest.update(b'|')
+    digest.update(archive_digest.encode('ascii'))
+    return digest.hexdigest()
+
+
+def load_status(path=STATUS_FILE):
+    try:
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    except Exception as e:
+        print(f"Could not load {path}: {e}")
+    return {}
+
+
+def write_status(status, path=STATUS_FILE):
+    write_json(path, status)
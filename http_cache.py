@@ -0,0 +1,87 @@
+"""
+Persistent HTTP validator cache for the DTE listing pages.
+Stores ETag/Last-Modified and a content hash per URL so unchanged pages
+can be skipped without parsing or rewriting any output files.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from atomic_io import write_json
+
+
+class HTTPValidatorCache:
+    def __init__(self, cache_dir='.http_cache'):
+        self.cache_dir = cache_dir
+        self.entries = {}
+        self.pending = {}
+
+    def _path(self, url):
+        """One small file per URL so separate scrapers never touch the same file"""
+        name = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{name}.json")
+
+    def get(self, url):
+        """Return the stored validators for url, or None"""
+        if url not in self.entries:
+            entry = None
+            try:
+                path = self._path(url)
+                if os.path.exists(path):
+                    with open(path, 'r', encoding='utf-8') as f:
+                        entry = json.load(f)
+            except Exception as e:
+                print(f"Could not read HTTP cache for {url}: {e}")
+            self.entries[url] = entry
+        return self.entries[url]
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers for a revalidation request"""
+        entry = self.get(url)
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    @staticmethod
+    def content_hash(content):
+        return hashlib.sha256(content).hexdigest()
+
+    def is_unchanged(self, url, response):
+        """True if the server answered 304 or the body matches the stored hash"""
+        if response.status_code == 304:
+            return True
+        entry = self.get(url)
+        return bool(entry) and entry.get('content_hash') == self.content_hash(response.content)
+
+    def remember(self, url, response):
+        """Stage validators from a response; written by save()"""
+        entry = dict(self.get(url) or {})
+        entry['url'] = url
+        if response.status_code != 304:
+            entry['etag'] = response.headers.get('ETag')
+            entry['last_modified'] = response.headers.get('Last-Modified')
+            entry['content_hash'] = self.content_hash(response.content)
+        entry['checked_at'] = datetime.now().isoformat()
+        self.entries[url] = entry
+        self.pending[url] = entry
+
+    def checked_at(self, url):
+        """When url was last fetched or revalidated, or None"""
+        entry = self.get(url)
+        if entry and entry.get('checked_at'):
+            return datetime.fromisoformat(entry['checked_at'])
+        return None
+
+    def save(self):
+        """Write staged entries to disk"""
+        if not self.pending:
+            return
+        for url, entry in self.pending.items():
+            write_json(self._path(url), entry)
+        self.pending = {}
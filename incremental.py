@@ -0,0 +1,64 @@
+"""
+Incremental scraping helpers.
+DTE listings are newest-first, so once a run of already-known circulars
+is seen the rest of the table can be skipped.
+"""
+
+import json
+import os
+
+from dedup import dedup_key
+
+
+def circular_key(circular):
+    """Identity of a circular, shared by all dedup passes"""
+    return dedup_key(circular)
+
+
+class KnownCirculars:
+    def __init__(self, keys=None):
+        self.keys = set(keys or [])
+
+    @classmethod
+    def from_files(cls, filenames):
+        """Collect keys from circulars.json / data_*.json style files"""
+        known = cls()
+        for filename in filenames:
+            try:
+                if os.path.exists(filename):
+                    with open(filename, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    known.keys.update(circular_key(c) for c in data.get('circulars', []))
+            except Exception as e:
+                print(f"Could not load known circulars from {filename}: {e}")
+        return known
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class IncrementalScan:
+    """Stops a newest-first scan after stop_after consecutive known rows"""
+
+    def __init__(self, known, stop_after=5):
+        self.known = known
+        self.stop_after = stop_after
+        self.new_count = 0
+        self.known_streak = 0
+        self.rows_seen = 0
+
+    def seen(self, circular):
+        """Record an accepted row; returns True when the scan should stop"""
+        self.rows_seen += 1
+        if circular_key(circular) in self.known:
+            self.known_streak += 1
+        else:
+            self.new_count += 1
+            self.known_streak = 0
+        return self.known_streak >= self.stop_after
+
+    def summary(self):
+        return f"{self.new_count} new of {self.rows_seen} rows checked"
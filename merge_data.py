@@ -1,19 +1,51 @@
 #!/usr/bin/env python3
 """
 Smart data merger for combining micro-scraper results.
-Handles fallback to baseline data if scrapers fail.
+A source without fresh data falls back to its last-known-good snapshot
+(snapshots.py) and, without a usable one, to its baseline rows; records
+are labeled fresh, cached or stale accordingly.
+
+With --stream the window is built without the store: the data files, the
+snapshots, the previous circulars.json and the baseline rows of stale
+sources are read as newest-first streams and k-way merged until the
+window is full, so memory and time depend on the window size, not on the
+history. Fresh records are still upserted into the store and the change
+digest covers the store in both modes, but the archive-wide outputs
+(search index, PDF annotations) are left to the next full merge.
 """
 
+import argparse
+import contextlib
 import json
 import os
-from datetime import datetime, timedelta
-import glob
+from datetime import datetime
+from http_cache import HTTPValidatorCache
+from sources import SOURCES, SOURCES_BY_KEY, source_key_for
+from circular_store import CircularStore
+from publish import publish_all
+from metrics import RunMetrics
+from atomic_io import file_lock
+from fingerprint import load_status
+from dedup import cluster_summary, report_near_duplicates
+from stream_merge import JSONArrayStream, merge_newest, newest_first
+from snapshots import CACHED, FRESH, STALE, SnapshotCache, age_hours
+
+# Candidates beyond the 400-slot window, used up by near-duplicates that get folded
+NEAR_DUPLICATE_SLACK = 100
 
 class DataMerger:
     def __init__(self):
-        self.sources = ['departmental', 'dvp', 'est', 'acm']
+        self.sources = [source.key for source in SOURCES]
         self.baseline_file = 'circulars-baseline.json'
         self.output_file = 'circulars.json'
+        self.store_file = 'circulars.db'
+        self.http_cache = HTTPValidatorCache()
+        self.metrics = RunMetrics('merge')
+        self.snapshots = SnapshotCache()
+        self.merge_info = {}
+        # Per source key: freshness tier, when it was last fresh, records loaded this run
+        self.source_status = {}
+        self._baseline = None
         
     def load_baseline(self):
         """Load baseline data as fallback"""
@@ -25,116 +57,323 @@ class DataMerger:
             print(f"⚠️ Could not load baseline: {e}")
         return None
     
+    def baseline_rows(self, source):
+        """Baseline circulars of one source key, the baseline file read at most once per run"""
+        if self._baseline is None:
+            baseline = self.load_baseline()
+            self._baseline = baseline.get('circulars', []) if baseline else []
+        return [circular for circular in self._baseline if source_key_for(circular) == source]
+    
+    def checked_at(self, data):
+        """When a data file (or its header) was scraped, or revalidated unchanged"""
+        scraped_time = datetime.fromisoformat(data['scraped_at'].replace('Z', '+00:00'))
+        # A 304/unchanged revalidation keeps the existing file fresh
+        checked_time = self.http_cache.checked_at(data.get('url', ''))
+        if checked_time and checked_time > scraped_time:
+            scraped_time = checked_time
+        return scraped_time
+    
+    def is_fresh(self, data, source):
+        """Whether a data file is within its source's fresh TTL"""
+        checked = self.checked_at(data)
+        age = (datetime.now(checked.tzinfo) - checked).total_seconds() / 3600
+        return age < SOURCES_BY_KEY[source].fresh_ttl_hours
+    
     def load_source_data(self, source):
-        """Load data from individual micro-scraper"""
+        """Load data from individual micro-scraper; None unless fresh"""
         filename = f"data_{source}.json"
         try:
             if os.path.exists(filename):
                 with open(filename, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                    # Check if data is recent (within last 4 hours)
-                    scraped_time = datetime.fromisoformat(data['scraped_at'].replace('Z', '+00:00'))
-                    if (datetime.now() - scraped_time).total_seconds() < 4 * 3600:
-                        return data['circulars']
+                    if self.is_fresh(data, source):
+                        return data
                     else:
                         print(f"⚠️ {source}: Data too old, skipping")
         except Exception as e:
             print(f"⚠️ {source}: Could not load - {e}")
-        return []
+        return None
+    
+    def use_fresh(self, source, data):
+        """Record a source with fresh records and keep them as its snapshot"""
+        self.source_status[source] = {'tier': FRESH, 'as_of': self.checked_at(data).isoformat(),
+                                      'records': len(data['circulars'])}
+        if self.snapshots.save(source, data):
+            self.metrics.count('snapshots_saved')
     
-    def merge_data(self):
+    def use_fallback(self, source, previous):
+        """Tier of a source without fresh records; returns its snapshot if it is still usable"""
+        as_of = previous.get(source, {}).get('as_of')
+        snapshot = self.snapshots.load(source)
+        if snapshot is not None:
+            # status.json is only committed with changed content, the snapshot may be newer
+            as_of = max(filter(None, (as_of, snapshot.get('scraped_at'))), default=None)
+            age = age_hours(as_of)
+            if age is not None and age < SOURCES_BY_KEY[source].snapshot_ttl_hours:
+                self.source_status[source] = {'tier': CACHED, 'as_of': as_of,
+                                              'records': len(snapshot.get('circulars', []))}
+                return snapshot
+        self.source_status[source] = {'tier': STALE, 'as_of': as_of, 'records': 0}
+        return None
+    
+    def open_source_stream(self, source):
+        """JSONArrayStream over a fresh data_<source>.json, or None"""
+        filename = f"data_{source}.json"
+        stream = None
+        try:
+            if os.path.exists(filename):
+                stream = JSONArrayStream(filename).open()
+                if self.is_fresh(stream.header, source):
+                    return stream
+                print(f"⚠️ {source}: Data too old, skipping")
+        except Exception as e:
+            print(f"⚠️ {source}: Could not load - {e}")
+        if stream is not None:
+            stream.close()
+        return None
+    
+    def merge_data(self, streaming=False):
         """Merge all available data sources"""
+        # Overlapping merges (or a scraper run) wait for the lock instead of interleaving writes
+        with file_lock(self.output_file):
+            if streaming:
+                try:
+                    return self._stream_data()
+                except ValueError as e:
+                    # UnsortedInput or a damaged file; the full merge copes with both
+                    print(f"⚠️ {e}, falling back to the full merge")
+                    self.metrics = RunMetrics('merge')
+                    self.source_status = {}
+            return self._merge_data()
+    
+    def _stream_data(self):
+        print("Starting streaming data merge...")
+        metrics = self.metrics
+        limit = 400 + NEAR_DUPLICATE_SLACK
+        
+        source_counts = {}
+        fresh_circulars = []
+        fresh_files = []
+        streams = []
+        readers = []
+        previous = load_status().get('sources', {})
+        with contextlib.ExitStack() as stack:
+            with metrics.stage('load'):
+                snapshot_files = []
+                for source in self.sources:
+                    stream = self.open_source_stream(source)
+                    if stream is not None and not stream.header.get('count'):
+                        stream.close()
+                        stream = None
+                    if stream is None:
+                        source_counts[source] = 0
+                        if self.use_fallback(source, previous) is not None:
+                            snapshot_files.append(self.snapshots.path(source))
+                    else:
+                        stack.callback(stream.close)
+                        fresh_files.append(stream.path)
+                        source_counts[source] = stream.header['count']
+                        streams.append(self._tap(newest_first(stream, stream.path), fresh_circulars))
+                        # Data files are bounded by the scraper window, reading one whole is cheap
+                        with open(stream.path, 'r', encoding='utf-8') as f:
+                            self.use_fresh(source, json.load(f))
+                    print(f"{source.upper()}: {source_counts[source]} circulars ({self.source_status[source]['tier']})")
+                
+                # Then the snapshots of missing sources, the last published window, and the
+                # baseline rows of sources with neither fresh data nor a usable snapshot
+                stale = {source for source, entry in self.source_status.items() if entry['tier'] == STALE}
+                for filename in snapshot_files + [self.output_file] + ([self.baseline_file] if stale else []):
+                    if os.path.exists(filename):
+                        reader = stack.enter_context(JSONArrayStream(filename))
+                        readers.append(reader)
+                        records = newest_first(reader, filename)
+                        if filename == self.baseline_file:
+                            records = (c for c in records if source_key_for(c) in stale)
+                        streams.append(records)
+            metrics.count('fresh_records', sum(source_counts.values()))
+            
+            with metrics.stage('merge'):
+                candidates = list(merge_newest(streams, limit))
+            metrics.count('records_read', len(fresh_circulars) + sum(reader.records_read for reader in readers))
+        print(f"Streamed {len(candidates)} candidates from {len(streams)} inputs")
+        
+        # Fresh records still reach the store for the archive and the next full merge;
+        # an upsert of the data files only, the history is not read (its digest reads
+        # one fingerprint column, so both modes detect changes the same way)
+        store = None
+        if os.path.exists(self.store_file):
+            with metrics.stage('store'):
+                store = CircularStore(self.store_file)
+                added = store.upsert(self._read_records(fresh_files))
+            metrics.count('new_records', added)
+            print(f"Upserted fresh circulars into {self.store_file} ({added} new)")
+        
+        with metrics.stage('dedup'):
+            candidates, clusters = report_near_duplicates(candidates)
+            final_circulars = candidates[:400]
+        metrics.count('near_duplicates_merged', sum(len(cluster['merged']) for cluster in clusters))
+        try:
+            return self._publish(final_circulars, store, fresh_circulars, source_counts, clusters, streaming=True)
+        finally:
+            if store is not None:
+                store.close()
+    
+    @staticmethod
+    def _read_records(filenames):
+        for filename in filenames:
+            with JSONArrayStream(filename) as stream:
+                yield from stream
+    
+    @staticmethod
+    def _tap(circulars, consumed):
+        """Pass circulars through, appending each one the merge took to consumed"""
+        for circular in circulars:
+            consumed.append(circular)
+            yield circular
+    
+    def _merge_data(self):
         print("Starting data merge...")
+        metrics = self.metrics
         
-        # Collect fresh data from all sources
+        # Collect fresh data from all sources, the snapshots of the others
         all_circulars = []
         source_counts = {}
+        snapshots = {}
         
-        for source in self.sources:
-            circulars = self.load_source_data(source)
-            all_circulars.extend(circulars)
-            source_counts[source] = len(circulars)
-            print(f"{source.upper()}: {len(circulars)} circulars")
+        with metrics.stage('load'):
+            previous = load_status().get('sources', {})
+            for source in self.sources:
+                data = self.load_source_data(source)
+                circulars = data['circulars'] if data else []
+                all_circulars.extend(circulars)
+                source_counts[source] = len(circulars)
+                if circulars:
+                    self.use_fresh(source, data)
+                else:
+                    snapshot = self.use_fallback(source, previous)
+                    if snapshot is not None:
+                        snapshots[source] = snapshot
+                print(f"{source.upper()}: {len(circulars)} circulars ({self.source_status[source]['tier']})")
+        metrics.count('fresh_records', len(all_circulars))
         
-        # If we got very little data, fall back to baseline
-        if len(all_circulars) < 50:
-            print("Too little fresh data, loading baseline...")
-            baseline = self.load_baseline()
-            if baseline and 'circulars' in baseline:
-                baseline_circulars = baseline['circulars']
-                # Mix fresh data with baseline
-                all_circulars.extend(baseline_circulars)
-                print(f"Added {len(baseline_circulars)} baseline circulars")
+        # Upsert fresh data into the persistent store (seeded from the last outputs on first run)
+        with metrics.stage('merge'):
+            store = CircularStore(self.store_file)
+            store.bootstrap([self.output_file, self.baseline_file])
+            added = store.upsert(all_circulars)
+            metrics.count('new_records', added)
+            print(f"Upserted {len(all_circulars)} fresh circulars ({added} new), store holds {store.count()}")
+            
+            # Sources without fresh data: their snapshot, or their baseline rows if the store
+            # has nothing of theirs yet; never overwriting newer records
+            for source in self.sources:
+                tier = self.source_status[source]['tier']
+                if tier == CACHED:
+                    added = store.insert_missing(snapshots[source]['circulars'])
+                    metrics.count('snapshot_records', added)
+                    print(f"{source.upper()}: snapshot as of {self.source_status[source]['as_of']}, {added} added")
+                elif tier == STALE and not store.recent(1, source):
+                    baseline_circulars = self.baseline_rows(source)
+                    if not baseline_circulars:
+                        continue
+                    added = store.insert_missing(baseline_circulars)
+                    metrics.count('baseline_records', added)
+                    print(f"{source.upper()}: added {added} of {len(baseline_circulars)} baseline circulars")
         
-        # Remove duplicates based on circular_no and description
-        seen = set()
-        unique_circulars = []
-        for circular in all_circulars:
-            key = (circular.get('circular_no', ''), circular.get('description', ''))
-            if key not in seen and key != ('', ''):
-                seen.add(key)
-                unique_circulars.append(circular)
+        # Export the newest 400 distinct circulars from the store; extra candidates keep
+        # the window full once near-duplicates are folded
+        with metrics.stage('select'):
+            candidates = store.recent(400 + NEAR_DUPLICATE_SLACK)
+        metrics.count('archive_records', store.count())
+        with metrics.stage('dedup'):
+            candidates, clusters = report_near_duplicates(candidates)
+            final_circulars = candidates[:400]
+        metrics.count('near_duplicates_merged', sum(len(cluster['merged']) for cluster in clusters))
+        try:
+            return self._publish(final_circulars, store, all_circulars, source_counts, clusters)
+        finally:
+            store.close()
+    
+    def _publish(self, final_circulars, store, fresh_circulars, source_counts, clusters, streaming=False):
+        """Write the window and its derived artifacts unless the content is unchanged.
         
-        # Sort by date, newest first
-        def parse_date(date_str):
-            try:
-                date_str = date_str.strip()
-                if '/' in date_str:
-                    parts = date_str.split('/')
-                    if len(parts) == 3:
-                        return datetime(int(parts[2]), int(parts[1]), int(parts[0]))
-                elif '-' in date_str:
-                    parts = date_str.split('-')
-                    if len(parts) == 3:
-                        if len(parts[2]) == 4:
-                            return datetime(int(parts[2]), int(parts[1]), int(parts[0]))
-                        elif len(parts[0]) == 4:
-                            return datetime(int(parts[0]), int(parts[1]), int(parts[2]))
-            except:
-                pass
-            return datetime(1900, 1, 1)
+        A streaming merge leaves the archive annotations and the search index as they
+        are; store is None only for a streaming merge without one.
+        """
+        metrics = self.metrics
+        archive = None
         
-        unique_circulars.sort(key=lambda x: parse_date(x['date']), reverse=True)
+        for entry in self.source_status.values():
+            metrics.count(f"sources_{entry['tier']}")
         
-        # Take top 400 circulars
-        final_circulars = unique_circulars[:400]
+        # Optional PDF mirror: new download links are fetched, records get pdf_sha256/pdf_size,
+        # then pdf_pages/pdf_excerpt from the extracted text (also searchable via the archive)
+        if os.getenv('MIRROR_PDFS') == 'true':
+            # Imported here: the mirror needs requests, which plain merges do not install
+            from pdf_mirror import PDFMirror
+            from pdf_text import PDFTextExtractor
+            # The search index covers the whole archive, so a full merge annotates all of it
+            archive = None if streaming else store.all()
+            with metrics.stage('pdf_mirror'):
+                mirror = PDFMirror()
+                mirror_stats = mirror.mirror(final_circulars, max_downloads=100)
+                mirror.annotate(archive or [])
+            with metrics.stage('pdf_text'):
+                extractor = PDFTextExtractor()
+                text_stats = extractor.enrich(final_circulars)
+                extractor.annotate(archive or [])
+            metrics.count('pdfs_downloaded', mirror_stats['downloaded'])
+            metrics.count('pdfs_extracted', text_stats['extracted'])
         
         # Count by source
-        final_counts = {}
-        for source in self.sources:
-            count = sum(1 for c in final_circulars if c.get('source', '').lower() == source)
-            final_counts[source] = count
+        final_counts = {source: 0 for source in self.sources}
+        for circular in final_circulars:
+            source = source_key_for(circular)
+            if source in final_counts:
+                final_counts[source] += 1
         
-        # Create final data structure
-        merged_data = {
-            'last_updated': datetime.now().isoformat(),
-            'total_circulars': len(final_circulars),
-            'circulars': final_circulars,
-            'scraping_status': 'success' if len(final_circulars) > 100 else 'partial',
-            'source_breakdown': final_counts,
-            'merge_info': {
-                'merged_at': datetime.now().isoformat(),
-                'sources_used': [s for s, c in source_counts.items() if c > 0],
-                'fresh_data_count': sum(source_counts.values()),
-                'total_after_merge': len(final_circulars)
-            }
+        self.merge_info = {
+            'merged_at': datetime.now().isoformat(),
+            'sources_used': [s for s, c in source_counts.items() if c > 0],
+            'fresh_data_count': sum(source_counts.values()),
+            'total_after_merge': len(final_circulars),
+            'mode': 'stream' if streaming else 'full'
         }
         
-        # Save merged data
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            json.dump(merged_data, f, ensure_ascii=False, indent=2)
+        # Per-run timestamps go to status.json, not into circulars.json
+        merged_data, status = publish_all(
+            final_circulars, store, self.source_status,
+            document={
+                'scraping_status': 'success' if len(final_circulars) > 100 else 'partial',
+                'source_breakdown': final_counts,
+            },
+            status_fields={
+                'merge_info': self.merge_info,
+                'near_duplicates': cluster_summary(clusters),
+            },
+            fresh_circulars=fresh_circulars, output_file=self.output_file,
+            archive=archive, index_archive=not streaming, metrics=metrics)
+        if not status['changed']:
+            metrics.write(status=merged_data['scraping_status'], outcome='unchanged')
+            return merged_data
         
         print(f"Merge complete: {len(final_circulars)} total circulars")
         print(f"Source breakdown: {final_counts}")
+        metrics.write(status=merged_data['scraping_status'], outcome='written')
         return merged_data
 
 def main():
+    parser = argparse.ArgumentParser(description='Merge the data_<source>.json files into circulars.json')
+    parser.add_argument('--stream', action='store_true',
+                        help='build the window from streamed files only, without reading the store')
+    args = parser.parse_args()
+    
     merger = DataMerger()
-    result = merger.merge_data()
+    result = merger.merge_data(streaming=args.stream)
     
     # Print summary
-    info = result.get('merge_info', {})
-    print(f"\nSummary:")
+    info = merger.merge_info
+    print("\nSummary:")
     print(f"   Fresh data: {info.get('fresh_data_count', 0)} circulars")
     print(f"   Final total: {info.get('total_after_merge', 0)} circulars")
     print(f"   Status: {result.get('scraping_status', 'unknown')}")
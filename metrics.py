@@ -0,0 +1,92 @@
+"""
+Per-run timing and counters for the scrapers and the merger.
+Stages (fetch, parse, validate, merge, select, write, ...) are timed with
+RunMetrics.stage(), counts such as bytes downloaded, rows seen/accepted/
+rejected and retries with count(), and each run is appended as one JSON
+line to metrics/<job>.jsonl, which status.html graphs.
+
+Stage times are summed over threads, so concurrent fetches can add up to
+more than the wall-clock duration of the run.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from atomic_io import atomic_write, file_lock
+
+METRICS_DIR = 'metrics'
+
+# Lines kept per job file
+MAX_RUNS = 200
+
+
+class RunMetrics:
+    def __init__(self, job, metrics_dir=METRICS_DIR, max_runs=MAX_RUNS):
+        self.job = job
+        self.metrics_dir = metrics_dir
+        self.metrics_file = os.path.join(metrics_dir, f"{job}.jsonl")
+        self.max_runs = max_runs
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self.stages = defaultdict(float)
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block under name"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            self.stages[name] += seconds
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def add_validation(self, stats):
+        """Fold CircularValidator.stats() in; validation runs inside the parse stage"""
+        self.add_time('validate', stats['elapsed_ms'] / 1000)
+        self.count('rows_accepted', stats['accepted'])
+        self.count('rows_rejected', stats['rejected'])
+        for reason, count in stats['reasons'].items():
+            self.count(f"rejected_{reason}", count)
+
+    def record(self, **extra):
+        """The run as a dict: duration, per-stage seconds and counters"""
+        with self._lock:
+            record = {
+                'job': self.job,
+                'started_at': self.started_at.isoformat(),
+                'duration_s': round(time.perf_counter() - self._started, 3),
+                'stages': {name: round(seconds, 3) for name, seconds in self.stages.items()},
+                'counters': dict(self.counters),
+            }
+        record.update(extra)
+        return record
+
+    def write(self, **extra):
+        """Append this run to metrics/<job>.jsonl, keeping the newest max_runs lines"""
+        record = self.record(**extra)
+        with file_lock(self.metrics_file):
+            lines = []
+            if os.path.exists(self.metrics_file):
+                with open(self.metrics_file, 'r', encoding='utf-8') as f:
+                    lines = [line for line in f if line.strip()]
+            lines.append(json.dumps(record, ensure_ascii=False, sort_keys=True) + '\n')
+            atomic_write(self.metrics_file, ''.join(lines[-self.max_runs:]))
+
+        stages = ', '.join(f"{name} {seconds:.2f}s" for name, seconds in
+                           sorted(record['stages'].items(), key=lambda item: -item[1]))
+        print(f"Run metrics ({self.job}): {record['duration_s']:.1f}s total; {stages or 'no stages'}")
+        return record
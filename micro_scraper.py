@@ -1,21 +1,46 @@
 #!/usr/bin/env python3
 """
 Lightweight micro-scraper for individual DTE Karnataka sources.
-Designed for GitHub Actions reliability - simple, fast, single-source.
+Designed for GitHub Actions reliability - simple and fast. Several sources
+can be scraped concurrently in one process and merged in-process (--merge),
+so a single job replaces one job per source plus a separate merge.
 """
 
 import requests
-from bs4 import BeautifulSoup
+import argparse
 import json
 import os
-import sys
 from datetime import datetime
 import time
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http_cache import HTTPValidatorCache
+from incremental import KnownCirculars, IncrementalScan, circular_key
+from row_parsers import get_row_parser
+from sources import SOURCES, SourceSchema, get_source, source_for_url
+from validation import CircularValidator
+from dates import date_iso, sort_key
+from fetch_controller import FetchController, RETRYABLE_STATUSES
+from metrics import RunMetrics
+from atomic_io import write_json
+from fingerprint import record_fingerprint
+from merge_data import DataMerger
+
+def fetch_controller_for(name):
+    """One fetch controller per process, its state in .http_cache/fetch-<name>.json"""
+    is_github_actions = os.getenv('GITHUB_ACTIONS') == 'true'
+    # Single attempt, fail fast: timeouts come from the URL's latency history
+    # and a section whose circuit is open is not contacted at all
+    return FetchController(name.lower(), default_timeout=(15, 45) if is_github_actions else (20, 60),
+                           max_attempts=1)
 
 class MicroScraper:
-    def __init__(self, source_name, url):
+    def __init__(self, source_name, url, fetch_controller=None):
         self.source_name = source_name
         self.url = url
+        # Table layout, header tokens and link rules for this section
+        self.source = (get_source(source_name) or source_for_url(url)
+                       or SourceSchema(source_name, url, layouts={3: (0, 1, 2)}))
         self.is_github_actions = os.getenv('GITHUB_ACTIONS') == 'true'
         
         # Simple, fast session
@@ -27,84 +52,136 @@ class MicroScraper:
             'Connection': 'keep-alive'
         })
         
-        # Simple timeout - no retries, fail fast
-        self.timeout = (15, 45) if self.is_github_actions else (20, 60)
+        # Shared with the other sources of the process when run_sources() passes it in
+        self.fetch_controller = fetch_controller or fetch_controller_for(source_name)
+        
+        # Conditional requests: unchanged pages are neither parsed nor rewritten
+        self.output_file = f"data_{source_name.lower()}.json"
+        self.http_cache = HTTPValidatorCache()
+        self.not_modified = False
+        
+        # Incremental mode: stop after a run of already-known circulars
+        self.incremental = os.getenv('SCRAPER_FULL_SCAN') != 'true'
+        self.known_stop_after = 5
+        self.max_rows = 20 if self.is_github_actions else 50
+        
+        # Row extraction backend, chosen by row_parsers.get_row_parser()
+        self.row_parser = get_row_parser()
+        self.validator = CircularValidator()
+        
+        # Per-stage timings and counters, written to metrics/micro-<source>.jsonl
+        self.metrics = RunMetrics(f"micro-{source_name.lower()}")
+
+    def load_existing(self):
+        """Circulars from the previous data file for this source"""
+        try:
+            if os.path.exists(self.output_file):
+                with open(self.output_file, 'r', encoding='utf-8') as f:
+                    return json.load(f).get('circulars', [])
+        except Exception as e:
+            print(f"Could not load {self.output_file}: {e}")
+        return []
 
-    def is_valid_circular(self, date, circular_no, description):
+    def merge_with_existing(self, circulars, existing=None):
+        """Put newly scraped rows in front of the previous window, newest first"""
+        if existing is None:
+            existing = self.load_existing()
+        previous = {circular_key(circular): circular for circular in existing}
+        seen = set()
+        merged = []
+        for circular in circulars + existing:
+            key = circular_key(circular)
+            if key not in seen:
+                seen.add(key)
+                # A re-scraped row with the same content keeps its original scraped_at
+                known = previous.get(key)
+                if known is not None and record_fingerprint(known) == record_fingerprint(circular):
+                    circular = known
+                merged.append(circular)
+        # Newest first (stable within a date), the order the streaming merge relies on
+        merged.sort(key=sort_key, reverse=True)
+        return merged[:self.max_rows]
+
+    def is_valid_circular(self, date, circular_no, description, download_link=''):
         """Basic validation for circular entries"""
-        if not date or len(date.strip()) <= 1:
-            return False
-        if not description or len(description.strip()) < 5:
-            return False
-        # Filter out unwanted domains
-        unwanted = ['atoall.com', 'webinsight', 'javascript:', 'system access']
-        desc_lower = description.lower()
-        return not any(unwanted_term in desc_lower for unwanted_term in unwanted)
+        return self.validator.is_valid(date, circular_no, description, download_link)
+
+    def write_metrics(self, **extra):
+        """Append this run's stage timings and counters to the metrics file"""
+        self.metrics.add_validation(self.validator.stats())
+        return self.metrics.write(**extra)
 
     def scrape(self):
         """Scrape single source with simple, fast approach"""
         print(f"Micro-scraping {self.source_name}: {self.url}")
         
         try:
+            # Revalidate only when there is an existing output to keep
+            has_output = os.path.exists(self.output_file)
+            headers = self.http_cache.conditional_headers(self.url) if has_output else {}
+            
             # Single attempt, fail fast
-            response = self.session.get(self.url, timeout=self.timeout, verify=False)
+            if not self.fetch_controller.allow(self.url):
+                print(f"Circuit open for {self.source_name}, skipping this run")
+                return []
+            started = time.perf_counter()
+            self.metrics.count('http_requests')
+            try:
+                with self.fetch_controller.host_slot(self.url), self.metrics.stage('fetch'):
+                    response = self.session.get(self.url, headers=headers, verify=False,
+                                                timeout=self.fetch_controller.timeout(self.url))
+            except requests.exceptions.RequestException:
+                self.metrics.count('http_failures')
+                self.fetch_controller.record_failure(self.url)
+                raise
+            self.metrics.count('bytes_downloaded', len(response.content))
+            if response.status_code in (200, 304):
+                self.fetch_controller.record_success(self.url, time.perf_counter() - started)
+            elif response.status_code in RETRYABLE_STATUSES:
+                self.fetch_controller.record_failure(self.url)
+            if has_output and response.status_code in (200, 304) and self.http_cache.is_unchanged(self.url, response):
+                print(f"Unchanged {self.source_name}: HTTP {response.status_code}, skipping parse")
+                self.not_modified = True
+                self.http_cache.remember(self.url, response)
+                return []
             if response.status_code != 200:
                 print(f"HTTP {response.status_code} - skipping")
                 return []
 
-            soup = BeautifulSoup(response.content, 'html.parser')
-            table_rows = soup.find_all('tr')
+            parse_started = time.perf_counter()
+            table_rows = self.row_parser.iter_rows(response.content, self.validator.is_blocked_href)
             
             # Process only recent entries for speed
-            max_rows = 20 if self.is_github_actions else 50
+            max_rows = self.max_rows
             circulars = []
             
-            for i, row in enumerate(table_rows[1:max_rows+1]):  # Skip header
-                cells = row.find_all('td')
-                if len(cells) < 3:
+            scan = None
+            if self.incremental:
+                known = KnownCirculars.from_files([self.output_file, 'circulars.json'])
+                scan = IncrementalScan(known, self.known_stop_after) if known else None
+            
+            for cells, href in islice(table_rows, 1, max_rows+1):  # Skip header
+                self.metrics.count('rows_seen')
+                if len(cells) < self.source.min_cells:
                     continue
                 
                 try:
-                    # Handle different table structures
-                    if self.source_name in ['EST', 'ACM'] and len(cells) >= 5:
-                        # 5-column format: date, circular_no, description, empty, action
-                        date = cells[0].get_text(strip=True)
-                        circular_no = cells[1].get_text(strip=True)
-                        description = cells[2].get_text(strip=True)
-                    elif self.source_name == 'DVP' and len(cells) >= 4:
-                        # 4-column format: skip serial, date, circular_no, description
-                        date = cells[1].get_text(strip=True)
-                        circular_no = cells[2].get_text(strip=True)
-                        description = cells[3].get_text(strip=True)
-                    else:
-                        # 3-column format (Departmental): date, circular_no, description
-                        date = cells[0].get_text(strip=True)
-                        circular_no = cells[1].get_text(strip=True)
-                        description = cells[2].get_text(strip=True)
+                    columns = self.source.columns(len(cells))
+                    date, circular_no, description = cells[columns[0]], cells[columns[1]], cells[columns[2]]
                     
                     # Skip headers
-                    if date.lower() in ['date', 'ದಿನಾಂಕ'] or len(description) < 10:
+                    if self.source.is_header(date, description):
                         continue
                     
+                    download_link = self.source.resolve_link(href)
+                    
                     # Basic validation
-                    if not self.is_valid_circular(date, circular_no, description):
+                    if not self.is_valid_circular(date, circular_no, description, download_link):
                         continue
                     
-                    # Extract download link
-                    download_link = ""
-                    for cell in cells:
-                        link = cell.find('a')
-                        if link and link.get('href'):
-                            href = link.get('href')
-                            if not any(bad in href for bad in ['atoall.com', 'javascript:']):
-                                if href.startswith('/'):
-                                    download_link = "https://dtek.karnataka.gov.in" + href
-                                elif href.startswith('http'):
-                                    download_link = href
-                                break
-                    
                     circulars.append({
                         'date': date,
+                        'date_iso': date_iso(date),
                         'circular_no': circular_no,
                         'description': description,
                         'download_link': download_link,
@@ -113,43 +190,147 @@ class MicroScraper:
                         'source': self.source_name
                     })
                     
+                    if scan and scan.seen(circulars[-1]):
+                        print(f"Reached {scan.known_streak} known circulars in a row, stopping early")
+                        break
+                    
                 except Exception as e:
                     # Skip problematic entries, continue processing
                     continue
             
+            self.metrics.add_time('parse', time.perf_counter() - parse_started)
+            if scan:
+                print(f"Incremental {self.source_name}: {scan.summary()}")
+            self.validator.report()
             print(f"Success {self.source_name}: Found {len(circulars)} circulars")
+            self.http_cache.remember(self.url, response)
             return circulars
             
         except Exception as e:
             print(f"Failed {self.source_name}: {str(e)}")
             return []
 
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: python micro_scraper.py <source_name> <url>")
-        sys.exit(1)
-    
-    source_name = sys.argv[1]
-    url = sys.argv[2]
+    def run(self):
+        """Scrape and write data_<source>.json unless the page is unchanged; returns the outcome"""
+        circulars = self.scrape()
+        self.fetch_controller.save()
+        
+        if self.not_modified:
+            # Keep the existing data file untouched, only record the revalidation
+            self.http_cache.save()
+            self.write_metrics(outcome='unchanged')
+            print(f"No changes for {self.source_name}, keeping {self.output_file}")
+            return 'unchanged'
+        
+        # Incremental runs only return the newest rows; keep the rest of the window
+        if self.incremental and circulars:
+            existing = self.load_existing()
+            circulars = self.merge_with_existing(circulars, existing)
+            if circulars == existing:
+                # Page changed (ads, counters) but no circular did: keep the file, the
+                # revalidation time in the HTTP cache keeps it fresh for the merger
+                self.http_cache.save()
+                self.write_metrics(outcome='unchanged')
+                print(f"No changed circulars for {self.source_name}, keeping {self.output_file}")
+                return 'unchanged'
+        else:
+            # Full scrapes are written newest first too, as merge_with_existing() does
+            circulars.sort(key=sort_key, reverse=True)
+        
+        data = {
+            'source': self.source_name,
+            'url': self.url,
+            'scraped_at': datetime.now().isoformat(),
+            'count': len(circulars),
+            'circulars': circulars,
+            'status': 'success' if circulars else 'no_data'
+        }
+        
+        # The data file is this source's checkpoint; written atomically, merged later under the lock
+        with self.metrics.stage('write'):
+            write_json(self.output_file, data)
+        
+        self.http_cache.save()
+        self.write_metrics(outcome=data['status'])
+        print(f"Saved {len(circulars)} circulars to {self.output_file}")
+        return data['status']
+
+def parse_sources(arguments):
+    """(source_name, url) pairs from source=url arguments, or the single <source_name> <url> form"""
+    if len(arguments) == 2 and '=' not in arguments[0] and '://' in arguments[1]:
+        arguments = [f"{arguments[0]}={arguments[1]}"]
+    sources = []
+    for argument in arguments:
+        name, separator, url = argument.partition('=')
+        if not separator or not name or not url:
+            raise ValueError(f"expected source=url, got {argument!r}")
+        sources.append((name, url))
+    return sources
+
+def load_config(path):
+    """(source_name, url) pairs from a JSON object mapping source names to listing URLs"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return list(json.load(f).items())
+
+def run_sources(sources, max_workers=None):
+    """Scrape several sources concurrently in one process; returns {source_name: outcome}"""
+    # Registry names keep data_<key>.json and the 'source' field stable however a source was spelled
+    names = []
+    for name, url in sources:
+        schema = get_source(name)
+        names.append((schema.name if schema else name, url))
+    # A single source keeps its own state file; several share one controller and file
+    fetch_controller = fetch_controller_for(names[0][0] if len(names) == 1 else 'sources')
+    scrapers = [MicroScraper(name, url, fetch_controller) for name, url in names]
     
-    scraper = MicroScraper(source_name, url)
-    circulars = scraper.scrape()
+    outcomes = {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(scrapers)) as executor:
+        futures = {executor.submit(scraper.run): scraper.source_name for scraper in scrapers}
+        for future in as_completed(futures):
+            source_name = futures[future]
+            try:
+                outcomes[source_name] = future.result()
+            except Exception as e:
+                print(f"Failed {source_name}: {e}")
+                outcomes[source_name] = 'failed'
+    return outcomes
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Scrape one or more DTE sections into data_<source>.json",
+        epilog="Examples: micro_scraper.py ACM <url> | micro_scraper.py acm=<url> est=<url> | "
+               "micro_scraper.py --all --merge")
+    parser.add_argument('sources', nargs='*', help='source=url pairs, or <source_name> <url>')
+    parser.add_argument('--config', help='JSON file mapping source names to listing URLs')
+    parser.add_argument('--all', action='store_true', help='scrape every source in the registry')
+    parser.add_argument('--workers', type=int, default=None, help='concurrent sources (default: all)')
+    parser.add_argument('--merge', action='store_true',
+                        help='merge the data files into circulars.json in this process')
+    parser.add_argument('--stream', action='store_true', help='with --merge, use the streaming merge')
+    args = parser.parse_args()
     
-    # Save to individual file
-    output_file = f"data_{source_name.lower()}.json"
-    data = {
-        'source': source_name,
-        'url': url,
-        'scraped_at': datetime.now().isoformat(),
-        'count': len(circulars),
-        'circulars': circulars,
-        'status': 'success' if circulars else 'no_data'
-    }
+    try:
+        sources = parse_sources(args.sources)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.config:
+        sources.extend(load_config(args.config))
+    if args.all:
+        sources.extend((source.name, source.url) for source in SOURCES)
+    if not sources:
+        parser.error('no sources given')
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    started = time.perf_counter()
+    outcomes = run_sources(sources, args.workers)
+    print(f"Scraped {len(outcomes)} sources in {time.perf_counter() - started:.1f}s: "
+          + ', '.join(f"{name} {outcome}" for name, outcome in sorted(outcomes.items())))
     
-    print(f"Saved {len(circulars)} circulars to {output_file}")
+    if args.merge:
+        # Nothing new upstream and a merged file exists: skip the rewrite
+        if all(outcome == 'unchanged' for outcome in outcomes.values()) and os.path.exists('circulars.json'):
+            print("All sources unchanged, skipping merge")
+        else:
+            DataMerger().merge_data(streaming=args.stream)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
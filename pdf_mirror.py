@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Content-addressed mirror of the circular PDFs behind download_link.
+New links are downloaded by a bounded thread pool (capped per host),
+interrupted downloads resume with Range requests, and finished files are
+stored once under pdf_cache/objects/<sha256[:2]>/<sha256>.pdf however
+many links point at them. pdf_sha256 and pdf_size are recorded on the
+circulars that reference each file.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from urllib.parse import urlparse
+
+import requests
+import urllib3
+
+from atomic_io import atomic_write, write_json
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+CACHE_DIR = 'pdf_cache'
+INDEX_FILE = 'index.json'
+CHUNK_SIZE = 64 * 1024
+PDF_MAGIC = b'%PDF'
+CONTENT_RANGE = re.compile(r'bytes (\d+)-\d+/(?:\d+|\*)$')
+
+
+def range_start(content_range):
+    """First byte offset of a 'bytes start-end/total' Content-Range, None if malformed"""
+    match = CONTENT_RANGE.match((content_range or '').strip())
+    return int(match.group(1)) if match else None
+
+
+def is_mirrorable(link):
+    """Only direct http(s) links to .pdf files are mirrored"""
+    parsed = urlparse(link or '')
+    return parsed.scheme in ('http', 'https') and parsed.path.lower().endswith('.pdf')
+
+
+class PDFMirror:
+    def __init__(self, cache_dir=CACHE_DIR, max_workers=4, per_host_limit=2,
+                 timeout=(10, 30), max_bytes=50 * 1024 * 1024, session=None):
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, 'objects')
+        self.partial_dir = os.path.join(cache_dir, 'partial')
+        self.index_file = os.path.join(cache_dir, INDEX_FILE)
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+
+        self.session = session or requests.Session()
+        self.session.headers.setdefault(
+            'User-Agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                          '(KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36')
+
+        self._host_semaphores = {}
+        self._lock = threading.Lock()
+        self.index = self.load_index()
+
+    def load_index(self):
+        """{url: {'sha256', 'size', 'fetched_at'}} of mirrored links"""
+        try:
+            if os.path.exists(self.index_file):
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Could not load PDF index: {e}")
+        return {}
+
+    def save_index(self):
+        atomic_write(self.index_file, json.dumps(self.index, indent=2, sort_keys=True))
+
+    def object_path(self, sha256):
+        return os.path.join(self.objects_dir, sha256[:2], f"{sha256}.pdf")
+
+    def host_semaphore(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_semaphores[host]
+
+    def partial_path(self, url):
+        return os.path.join(self.partial_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.part')
+
+    def _fetch(self, url, part, offset):
+        """Write url's body from offset on into part; False if a 206 started elsewhere"""
+        headers = {'Range': f"bytes={offset}-"} if offset else {}
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout,
+                              verify=False) as response:
+            if response.status_code == 416 and offset:
+                # The partial file already holds the whole body
+                return True
+            if response.status_code not in (200, 206):
+                raise requests.HTTPError(f"HTTP {response.status_code}")
+            if response.status_code == 200:
+                # Server ignored the Range header: start over
+                offset = 0
+            elif range_start(response.headers.get('Content-Range')) != offset:
+                # Appending a range for another offset would corrupt the file
+                open(part, 'wb').close()
+                return False
+            with open(part, 'ab' if offset else 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+                    offset += len(chunk)
+                    if offset > self.max_bytes:
+                        break
+        if offset > self.max_bytes:
+            os.remove(part)
+            raise ValueError(f"larger than {self.max_bytes} bytes")
+        return True
+
+    def download(self, url):
+        """Fetch url into the object store, resuming a partial file; returns its index entry"""
+        os.makedirs(self.partial_dir, exist_ok=True)
+        part = self.partial_path(url)
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+
+        with self.host_semaphore(url):
+            # A mismatched range truncates the partial file; fetch the whole body instead
+            if not self._fetch(url, part, offset) and not self._fetch(url, part, 0):
+                raise ValueError('partial response to a request for the whole file')
+
+        digest = hashlib.sha256()
+        with open(part, 'rb') as f:
+            magic = f.read(len(PDF_MAGIC))
+            digest.update(magic)
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        if magic != PDF_MAGIC:
+            # Error pages come back as 200 text/html; do not keep or resume them
+            os.remove(part)
+            raise ValueError('response is not a PDF')
+
+        sha256 = digest.hexdigest()
+        target = self.object_path(sha256)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.exists(target):
+            os.remove(part)
+        else:
+            os.replace(part, target)
+        return {'sha256': sha256, 'size': os.path.getsize(target),
+                'fetched_at': datetime.now().isoformat()}
+
+    def annotate(self, circulars):
+        """Copy the hash and size of mirrored files onto the records; returns how many have one"""
+        annotated = 0
+        for circular in circulars:
+            entry = self.index.get(circular.get('download_link') or '')
+            if entry:
+                circular['pdf_sha256'] = entry['sha256']
+                circular['pdf_size'] = entry['size']
+                annotated += 1
+        return annotated
+
+    def mirror(self, circulars, max_downloads=None):
+        """Download links not mirrored yet, then annotate circulars; returns the stats"""
+        pending = []
+        for circular in circulars:
+            link = circular.get('download_link') or ''
+            if is_mirrorable(link) and link not in self.index and link not in pending:
+                pending.append(link)
+        if max_downloads is not None:
+            pending = pending[:max_downloads]
+
+        stats = {'downloaded': 0, 'failed': 0, 'deduplicated': 0}
+        known_hashes = {entry['sha256'] for entry in self.index.values()}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.download, url): url for url in pending}
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    stats['failed'] += 1
+                    print(f"PDF mirror failed for {url}: {e}")
+                    continue
+                if entry['sha256'] in known_hashes:
+                    stats['deduplicated'] += 1
+                known_hashes.add(entry['sha256'])
+                self.index[url] = entry
+                stats['downloaded'] += 1
+
+        if pending:
+            self.save_index()
+        stats['annotated'] = self.annotate(circulars)
+        print(f"PDF mirror: {stats['downloaded']} downloaded ({stats['deduplicated']} duplicates), "
+              f"{stats['failed']} failed, {stats['annotated']} of {len(circulars)} circulars mirrored")
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mirror the PDFs linked from a circulars file')
+    parser.add_argument('filename', nargs='?', default='circulars.json')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--max-downloads', type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.filename, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    mirror = PDFMirror(cache_dir=args.cache_dir, max_workers=args.workers)
+    mirror.mirror(data.get('circulars', []), max_downloads=args.max_downloads)
+
+    write_json(args.filename, data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Text extraction for mirrored circular PDFs.
+Files from the pdf_mirror object store are parsed in a process pool,
+keyed by their SHA-256 so no file is processed twice; the page count and
+a truncated excerpt are cached under pdf_cache/text/ and copied onto the
+circulars. Each file gets its own time limit so one malformed PDF cannot
+stall the merge job.
+"""
+
+import argparse
+import json
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from atomic_io import write_json
+from pdf_mirror import CACHE_DIR, PDFMirror
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pypdf is optional, extraction is skipped without it
+    PdfReader = None
+
+EXCERPT_CHARS = 500
+
+
+class ExtractionTimeout(Exception):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise ExtractionTimeout()
+
+
+def extract_text(path, timeout, excerpt_chars=EXCERPT_CHARS):
+    """Page count and whitespace-collapsed excerpt of one PDF, run in a worker process"""
+    use_alarm = timeout and hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.alarm(timeout)
+    try:
+        reader = PdfReader(path)
+        pages = len(reader.pages)
+        parts = []
+        collected = 0
+        for page in reader.pages:
+            text = ' '.join((page.extract_text() or '').split())
+            if text:
+                parts.append(text)
+                collected += len(text) + 1
+            if collected >= excerpt_chars:
+                break
+        return {'pages': pages, 'excerpt': ' '.join(parts)[:excerpt_chars]}
+    except ExtractionTimeout:
+        return {'error': f"timed out after {timeout}s"}
+    except Exception as e:
+        return {'error': f"{type(e).__name__}: {e}"[:200]}
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+
+
+class PDFTextExtractor:
+    def __init__(self, cache_dir=CACHE_DIR, max_workers=None, timeout=20, excerpt_chars=EXCERPT_CHARS):
+        self.mirror = PDFMirror(cache_dir=cache_dir)
+        self.text_dir = os.path.join(cache_dir, 'text')
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.timeout = timeout
+        self.excerpt_chars = excerpt_chars
+
+    def text_path(self, sha256):
+        return os.path.join(self.text_dir, f"{sha256}.json")
+
+    def load(self, sha256):
+        try:
+            with open(self.text_path(sha256), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, sha256, result):
+        result = dict(result, sha256=sha256, extracted_at=datetime.now().isoformat())
+        write_json(self.text_path(sha256), result, compact=True)
+        return result
+
+    def annotate(self, circulars):
+        """Copy cached page counts and excerpts onto records with a pdf_sha256"""
+        annotated = 0
+        for circular in circulars:
+            sha256 = circular.get('pdf_sha256')
+            result = self.load(sha256) if sha256 else None
+            if result and 'error' not in result:
+                circular['pdf_pages'] = result['pages']
+                circular['pdf_excerpt'] = result['excerpt']
+                annotated += 1
+        return annotated
+
+    def enrich(self, circulars):
+        """Extract text of mirrored PDFs not processed yet, then annotate; returns the stats"""
+        pending = []
+        for circular in circulars:
+            sha256 = circular.get('pdf_sha256')
+            if sha256 and sha256 not in pending and not os.path.exists(self.text_path(sha256)) \
+                    and os.path.exists(self.mirror.object_path(sha256)):
+                pending.append(sha256)
+
+        stats = {'extracted': 0, 'failed': 0}
+        if pending and PdfReader is None:
+            print(f"PDF text: pypdf not installed, skipping {len(pending)} files")
+            pending = []
+
+        if pending:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {executor.submit(extract_text, self.mirror.object_path(sha256),
+                                           self.timeout, self.excerpt_chars): sha256
+                           for sha256 in pending}
+                for future in as_completed(futures):
+                    sha256 = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # Worker crashed; not cached so the file is retried next run
+                        stats['failed'] += 1
+                        print(f"PDF text worker failed for {sha256[:12]}: {e}")
+                        continue
+                    # Failures are cached too, so a broken file is not retried every run
+                    self.save(sha256, result)
+                    if 'error' in result:
+                        stats['failed'] += 1
+                        print(f"PDF text failed for {sha256[:12]}: {result['error']}")
+                    else:
+                        stats['extracted'] += 1
+
+        stats['annotated'] = self.annotate(circulars)
+        print(f"PDF text: {stats['extracted']} extracted, {stats['failed']} failed, "
+              f"{stats['annotated']} of {len(circulars)} circulars have text")
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract text from the mirrored PDFs of a circulars file')
+    parser.add_argument('filename', nargs='?', default='circulars.json')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--timeout', type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.filename, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    circulars = data.get('circulars', [])
+    extractor = PDFTextExtractor(cache_dir=args.cache_dir, max_workers=args.workers, timeout=args.timeout)
+    extractor.mirror.annotate(circulars)
+    extractor.enrich(circulars)
+
+    write_json(args.filename, data)
+
+
+if __name__ == "__main__":
+    main()
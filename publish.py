@@ -0,0 +1,238 @@
+"""
+Compact publish artifacts for the frontend.
+circulars.json stays readable for debugging; alongside it a minified,
+dictionary-encoded circulars.min.json is written, where low-cardinality
+values (source URL, source name, freshness) are interned into tables and
+the common download_link prefix is stored once, plus .gz and .br
+precompressed copies for hosts that can serve them.
+
+publish_all() is the one publish sequence of scraper.py and merge_data.py:
+freshness labels, the change digest, circulars.json with its compact
+copies and shards, the change log and feeds, the search index and
+status.json.
+"""
+
+import contextlib
+import gzip
+import json
+import os
+from datetime import datetime
+
+from atomic_io import atomic_write, write_json
+from fingerprint import dataset_digest, load_status, write_status
+from snapshots import label_freshness
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, only the .br copies are skipped
+    brotli = None
+
+COMPACT_FORMAT = 'circulars-compact/1'
+
+# Column order of the encoded rows; missing fields are stored as null
+FIELDS = ('date', 'date_iso', 'circular_no', 'description', 'download_link',
+          'source_url', 'scraped_at', 'source', 'freshness')
+
+# Fields with a handful of distinct values, stored as table indices. scraped_at is
+# not one of them: records keep their first scrape time, so it is mostly unique
+# and a table would only add an index per row
+INTERNED_FIELDS = ('source_url', 'source', 'freshness')
+
+
+def common_link_prefix(circulars):
+    """Longest directory prefix shared by the download links of the most common origin"""
+    links = [c.get('download_link') or '' for c in circulars]
+    links = [link for link in links if '://' in link]
+    if not links:
+        return ''
+    origins = {}
+    for link in links:
+        origin = link.split('/', 3)[:3]
+        origins.setdefault('/'.join(origin), []).append(link)
+    group = max(origins.values(), key=len)
+    prefix = os.path.commonprefix(group)
+    return prefix[:prefix.rfind('/') + 1]
+
+
+def encode_compact(data):
+    """Dictionary-encoded copy of a circulars document (see decode_compact)"""
+    circulars = data.get('circulars', [])
+    link_prefix = common_link_prefix(circulars)
+    tables = {field: [] for field in INTERNED_FIELDS}
+    indices = {field: {} for field in INTERNED_FIELDS}
+
+    rows = []
+    for circular in circulars:
+        row = []
+        for field in FIELDS:
+            value = circular.get(field)
+            if value is not None and field in indices:
+                index = indices[field].get(value)
+                if index is None:
+                    index = indices[field][value] = len(tables[field])
+                    tables[field].append(value)
+                value = index
+            elif field == 'download_link' and value and link_prefix and value.startswith(link_prefix):
+                # Relative links never contain '://', which tells the decoder to add the prefix
+                value = value[len(link_prefix):]
+            row.append(value)
+        extra = {key: value for key, value in circular.items() if key not in FIELDS}
+        if extra:
+            row.append(extra)
+        rows.append(row)
+
+    compact = {key: value for key, value in data.items() if key != 'circulars'}
+    compact.update({
+        'format': COMPACT_FORMAT,
+        'fields': list(FIELDS),
+        'link_prefix': link_prefix,
+        'tables': tables,
+        'rows': rows,
+    })
+    return compact
+
+
+def decode_compact(compact):
+    """Readable circulars document from encode_compact output"""
+    fields = compact['fields']
+    tables = compact['tables']
+    link_prefix = compact['link_prefix']
+
+    circulars = []
+    for row in compact['rows']:
+        circular = {}
+        for field, value in zip(fields, row):
+            if value is None:
+                continue
+            if field in tables:
+                value = tables[field][value]
+            elif field == 'download_link' and value and '://' not in value:
+                value = link_prefix + value
+            circular[field] = value
+        if len(row) > len(fields):
+            circular.update(row[len(fields)])
+        circulars.append(circular)
+
+    data = {key: value for key, value in compact.items()
+            if key not in ('format', 'fields', 'link_prefix', 'tables', 'rows')}
+    data['circulars'] = circulars
+    return data
+
+
+def dumps_compact(data):
+    """Minified UTF-8 bytes of the encoded document"""
+    return json.dumps(encode_compact(data), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def write_precompressed(path, payload):
+    """Write payload plus .gz (and .br when brotli is installed); returns {path: size}"""
+    sizes = {}
+    sizes[path] = atomic_write(path, payload)
+
+    # mtime=0 keeps the gzip bytes identical for identical payloads
+    compressed = gzip.compress(payload, compresslevel=9, mtime=0)
+    sizes[path + '.gz'] = atomic_write(path + '.gz', compressed)
+
+    if brotli is not None:
+        compressed = brotli.compress(payload, quality=11)
+        sizes[path + '.br'] = atomic_write(path + '.br', compressed)
+    return sizes
+
+
+def write_compact(data, readable_file='circulars.json'):
+    """Write <name>.min.json and its compressed copies next to the readable file, reporting sizes"""
+    base, ext = os.path.splitext(readable_file)
+    sizes = write_precompressed(f"{base}.min{ext}", dumps_compact(data))
+
+    readable_size = os.path.getsize(readable_file) if os.path.exists(readable_file) else 0
+    print(f"Publish artifacts for {readable_file} ({readable_size / 1024:.1f} KB readable):")
+    for path, size in sizes.items():
+        saved = f", {100 - size * 100 / readable_size:.0f}% smaller" if readable_size else ''
+        print(f"  - {path}: {size / 1024:.1f} KB{saved}")
+    if brotli is None:
+        print("  - .br skipped (brotli not installed)")
+    return sizes
+
+
+def publish_all(circulars, store, sources, document=None, status_fields=None, fresh_circulars=(),
+                output_file='circulars.json', archive=None, index_archive=True, metrics=None):
+    """Publish a window and its derived artifacts unless its content is unchanged.
+
+    sources maps source keys to their status.json entry ({'tier', 'as_of', 'records'});
+    records are labeled with their source's tier. document and status_fields add
+    caller-specific members to circulars.json and status.json. The digest combines the
+    window with store.digest(), so it means the same for every caller; when it matches
+    the last publish only status.json is rewritten. The search index covers archive
+    (store.all() when not given) and is rebuilt only when the store digest or a shard
+    layout differs from its last build; index_archive=False leaves it as it is.
+    Returns (data, status); status['changed'] tells whether the window was written.
+    """
+    # Imported here: shards and search_index build on the compact encoder above
+    from changelog import ChangeLog, write_feeds
+    from search_index import SEARCH_INDEX_FILE, write_search_index
+    from shards import shard_layout, split_categories, write_shards
+
+    stage = metrics.stage if metrics is not None else (lambda name: contextlib.nullcontext())
+
+    tiers = {source: entry['tier'] for source, entry in sources.items()}
+    label_freshness(circulars, tiers)
+    now = datetime.now().isoformat()
+    data = {
+        'last_updated': now,
+        'total_circulars': len(circulars),
+        'circulars': circulars,
+    }
+    data.update(document or {})
+    data['source_freshness'] = tiers
+
+    # Same content as the last publish: leave every artifact untouched so nothing is committed or deployed
+    with stage('fingerprint'):
+        store_digest = store.digest() if store is not None else ''
+        digest = dataset_digest(circulars, store_digest)
+        status = load_status()
+    changed = status.get('digest') != digest or not os.path.exists(output_file)
+    status.update({
+        'last_checked': now,
+        'last_changed': now if changed else status.get('last_changed'),
+        'digest': digest,
+        'changed': changed,
+        'total_circulars': len(circulars),
+        'sources': sources,
+    })
+    if store is not None:
+        status['archive_circulars'] = store.count()
+    status.update(status_fields or {})
+
+    if changed:
+        with stage('write'):
+            write_json(output_file, data)
+
+        with stage('publish'):
+            # Compact and per-tab artifacts for the frontend, circulars.json stays readable
+            write_compact(data, output_file)
+            write_shards(data)
+
+            # Delta log and feeds so consumers can fetch only what changed
+            ChangeLog().record(circulars, fresh_circulars)
+            write_feeds(data)
+    else:
+        print(f"Content unchanged (digest {digest[:12]}), keeping {output_file} and published artifacts")
+
+    if index_archive and store is not None:
+        # The index points into the shard rows, so it follows the archive and the row layouts;
+        # checked on unchanged runs too, a streaming merge may have moved the rows
+        index_key = {
+            'store_digest': store_digest,
+            'layouts': {key: shard_layout(rows) for key, rows in split_categories(circulars).items()},
+        }
+        if status.get('search_index') == index_key and os.path.exists(SEARCH_INDEX_FILE):
+            print(f"Search index up to date (store digest {store_digest[:12]})")
+        else:
+            with stage('search_index'):
+                write_search_index(archive if archive is not None else store.all(), circulars)
+            status['search_index'] = index_key
+    # Recorded last, so an interrupted publish is redone on the next run
+    write_status(status)
+    if changed and metrics is not None:
+        metrics.count('circulars_published', len(circulars))
+    return data, status
@@ -0,0 +1,184 @@
+"""
+Table row extraction backends for the DTE listing pages.
+Every backend yields (cells, href) per <tr>: the stripped text of each
+<td> and the first acceptable <a href> in the row ('' if none).
+"""
+
+import codecs
+import os
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional, the stdlib streaming parser stands in for it
+    etree = None
+
+# Backend used unless $ROW_PARSER names another one
+DEFAULT_ROW_PARSER = 'lxml' if etree is not None else 'streaming'
+
+CHUNK_SIZE = 16 * 1024
+
+
+def _accept_all(href):
+    return False
+
+
+def _chunks(content, size=CHUNK_SIZE):
+    for start in range(0, len(content), size):
+        yield content[start:start + size]
+
+
+class SoupRowParser:
+    """Original full-DOM BeautifulSoup(html.parser) path"""
+    name = 'soup'
+
+    def iter_rows(self, content, is_blocked_href=_accept_all):
+        soup = BeautifulSoup(content, 'html.parser')
+        for row in soup.find_all('tr'):
+            cells = row.find_all('td')
+            href = ''
+            for cell in cells:
+                link = cell.find('a')
+                if link and link.get('href'):
+                    if not is_blocked_href(link.get('href')):
+                        href = link.get('href')
+                        break
+            yield [cell.get_text(strip=True) for cell in cells], href
+
+
+class _RowCollector(HTMLParser):
+    """HTMLParser that only keeps the row currently being read"""
+
+    def __init__(self, is_blocked_href):
+        super().__init__(convert_charrefs=True)
+        self.is_blocked_href = is_blocked_href
+        self.rows = []
+        self.cells = None
+        self.cell = None
+        self.cell_has_link = False
+        self.href = ''
+        self.skip_depth = 0
+        self.text = []
+
+    def _flush_text(self):
+        # Text nodes may arrive in several pieces; strip each node as a whole
+        if self.text:
+            data = ''.join(self.text).strip()
+            self.text = []
+            if data and self.cell is not None:
+                self.cell.append(data)
+
+    def _close_cell(self):
+        if self.cell is not None:
+            self.cells.append(''.join(self.cell))
+            self.cell = None
+
+    def _close_row(self):
+        if self.cells is not None:
+            self._close_cell()
+            self.rows.append((self.cells, self.href))
+            self.cells = None
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if tag == 'tr':
+            self._close_row()
+            self.cells = []
+            self.href = ''
+        elif tag == 'td' and self.cells is not None:
+            self._close_cell()
+            self.cell = []
+            self.cell_has_link = False
+        elif tag == 'a' and self.cell is not None and not self.cell_has_link:
+            # Like cell.find('a'): only the first anchor of each cell counts
+            self.cell_has_link = True
+            href = dict(attrs).get('href')
+            if href and not self.href and not self.is_blocked_href(href):
+                self.href = href
+        elif tag in ('script', 'style'):
+            self.skip_depth += 1
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        if tag == 'td':
+            self._close_cell()
+        elif tag in ('tr', 'table'):
+            self._close_row()
+        elif tag in ('script', 'style') and self.skip_depth:
+            self.skip_depth -= 1
+
+    def handle_data(self, data):
+        if self.cell is not None and not self.skip_depth:
+            self.text.append(data)
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+
+class StreamingRowParser:
+    """Incremental stdlib parser, no document tree is built"""
+    name = 'streaming'
+
+    def iter_rows(self, content, is_blocked_href=_accept_all, encoding='utf-8'):
+        collector = _RowCollector(is_blocked_href)
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        for chunk in _chunks(content):
+            collector.feed(decoder.decode(chunk))
+            if collector.rows:
+                yield from collector.rows
+                collector.rows = []
+        collector.feed(decoder.decode(b'', final=True))
+        collector.close()
+        collector._flush_text()
+        collector._close_row()
+        yield from collector.rows
+
+
+class LxmlRowParser:
+    """Incremental lxml pull parser, finished rows are discarded"""
+    name = 'lxml'
+
+    def iter_rows(self, content, is_blocked_href=_accept_all, encoding='utf-8'):
+        parser = etree.HTMLPullParser(events=('end',), tag='tr', encoding=encoding)
+        for chunk in _chunks(content):
+            parser.feed(chunk)
+            yield from self._read_rows(parser, is_blocked_href)
+        parser.close()
+        yield from self._read_rows(parser, is_blocked_href)
+
+    def _read_rows(self, parser, is_blocked_href):
+        for _, row in parser.read_events():
+            cells = []
+            href = ''
+            for cell in row.iter('td'):
+                etree.strip_elements(cell, 'script', 'style', with_tail=False)
+                cells.append(''.join(text.strip() for text in cell.itertext(etree.Element)))
+                if not href:
+                    link = next(cell.iter('a'), None)
+                    if link is not None and link.get('href') and not is_blocked_href(link.get('href')):
+                        href = link.get('href')
+            yield cells, href
+            # Drop the finished row and anything before it
+            row.clear()
+            while row.getprevious() is not None:
+                del row.getparent()[0]
+
+
+ROW_PARSERS = {
+    SoupRowParser.name: SoupRowParser,
+    StreamingRowParser.name: StreamingRowParser,
+    LxmlRowParser.name: LxmlRowParser,
+}
+
+
+def get_row_parser(name=None):
+    """Row parser by name, defaulting to $ROW_PARSER, then DEFAULT_ROW_PARSER"""
+    name = name or os.getenv('ROW_PARSER') or DEFAULT_ROW_PARSER
+    if name not in ROW_PARSERS:
+        raise ValueError(f"Unknown row parser '{name}', expected one of {sorted(ROW_PARSERS)}")
+    if name == 'lxml' and etree is None:
+        print("lxml not installed, falling back to streaming row parser")
+        name = 'streaming'
+    return ROW_PARSERS[name]()
@@ -1,27 +1,46 @@
 import requests
-from bs4 import BeautifulSoup
 import json
 import os
 from datetime import datetime
 import time
 import signal
 import sys
+import glob
+import re
+import html
+import argparse
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 import urllib3
-import ssl
+from http_cache import HTTPValidatorCache
+from incremental import KnownCirculars, IncrementalScan, circular_key
+from row_parsers import get_row_parser
+from sources import SOURCES, SourceSchema, source_for_url, source_key_for
+from validation import CircularValidator
+from dates import date_iso
+from selection import select_recent
+from circular_store import CircularStore
+from atomic_io import file_lock, write_json
+from fingerprint import load_status
+from dedup import cluster_summary, report_near_duplicates
+from snapshots import CACHED, FRESH, STALE, age_hours
+from fetch_controller import FetchController, RETRYABLE_STATUSES
+from metrics import RunMetrics
+from publish import publish_all
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Pagination links of the DTE listings (?page=N)
+PAGE_LINK = re.compile(r'href=["\']([^"\']*[?&](?:amp;)?page=(\d+)[^"\']*)["\']', re.IGNORECASE)
+PAGE_NUMBER = re.compile(r'([?&]page=)\d+')
+
 class CircularScraper:
     def __init__(self):
         self.is_github_actions = os.getenv('GITHUB_ACTIONS') == 'true'
         
-        self.urls = [
-            "https://dtek.karnataka.gov.in/info-4/Departmental+Circulars/kn",
-            "https://dtek.karnataka.gov.in/page/Circulars/DVP/kn",
-            "https://dtek.karnataka.gov.in/page/Circulars/EST/kn",
-            "https://dtek.karnataka.gov.in/page/Circulars/ACM-Polytechnic/kn"
-        ]
+        # Listing pages come from the shared source registry
+        self.urls = [source.url for source in SOURCES]
         
         # Enhanced session with multiple fallback user agents and headers
         self.session = requests.Session()
@@ -40,68 +59,52 @@ class CircularScraper:
             'Cache-Control': 'max-age=0'
         })
         
-        # Enhanced retry strategy with exponential backoff
-        retry_strategy = Retry(
-            total=5,  # More retries
-            backoff_factor=2,  # Exponential backoff: 2, 4, 8, 16 seconds
-            status_forcelist=[429, 500, 502, 503, 504, 520, 521, 522, 523, 524],
-            allowed_methods=["HEAD", "GET", "OPTIONS"],
-            raise_on_redirect=False,
-            raise_on_status=False
-        )
-        
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # No urllib3 retries: the fetch controller owns the single retry budget
+        adapter = HTTPAdapter(max_retries=0)
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
         
         self.start_time = datetime.now()
         self.max_execution_time = 600 if self.is_github_actions else 900  # 10 min for GHA with 4 URLs, 15 min local
+        
+        # Concurrent fetching: all sources at once, capped per host by the fetch controller
+        self.max_workers = len(self.urls)
+        self.source_timings = {}
+        
+        # Per-URL latency history, adaptive timeouts and circuit breaker, kept across runs
+        self.fetch_controller = FetchController('scraper', max_attempts=2 if self.is_github_actions else 3)
+        
+        # Conditional requests: skip parsing pages that have not changed
+        self.output_file = 'circulars.json'
+        self.http_cache = HTTPValidatorCache()
+        self.unchanged_urls = set()
+        # Listing pages that were read (or revalidated) this run: their sources are fresh
+        self.reached_urls = set()
+        
+        # Incremental mode: stop a listing after a run of already-known circulars
+        self.incremental = os.getenv('SCRAPER_FULL_SCAN') != 'true'
+        self.known_stop_after = 5
+        self.known = None
+        self.store = None
+        # New circulars already upserted per source during this run
+        self.checkpointed = 0
+        self.near_duplicates = []
+        
+        # Backfill: crawl all listing pages with a few workers, resumable
+        self.backfill_workers = 3
+        self.checkpoint_file = 'backfill_checkpoint.json'
+        
+        # Row extraction backend, chosen by row_parsers.get_row_parser()
+        self.row_parser = get_row_parser()
+        self.validator = CircularValidator()
+        
+        # Per-stage timings and counters, written to metrics/scraper.jsonl
+        self.metrics = RunMetrics('scraper')
     
     
     def is_valid_circular(self, date, circular_no, description, download_link):
         """Validate if the circular entry is legitimate"""
-        # Filter out unwanted websites and invalid entries
-        unwanted_domains = [
-            'atoall.com', 
-            'webinsight.cs.washington.edu',
-            'satogo.com',
-            'javascript:'
-        ]
-        
-        # Check if download link contains unwanted domains
-        if download_link:
-            for domain in unwanted_domains:
-                if domain in download_link.lower():
-                    return False
-        
-        # Check if circular_no contains unwanted values
-        if circular_no:
-            unwanted_circular_nos = ['atoall', 'webanywhere', 'system access to go']
-            if circular_no.lower() in unwanted_circular_nos:
-                return False
-        
-        # Check if description indicates external website
-        if description:
-            unwanted_descriptions = [
-                'external website that opens in a new window',
-                'javascript:',
-                'webanywhere',
-                'system access'
-            ]
-            desc_lower = description.lower()
-            for unwanted in unwanted_descriptions:
-                if unwanted in desc_lower:
-                    return False
-        
-        # Must have meaningful date (allow single digits for day/month)
-        if not date or len(date.strip()) <= 1:
-            return False
-        
-        # Must have some description
-        if not description or len(description.strip()) < 5:
-            return False
-            
-        return True
+        return self.validator.is_valid(date, circular_no, description, download_link)
         
     def check_execution_time(self):
         elapsed = (datetime.now() - self.start_time).total_seconds()
@@ -110,11 +113,30 @@ class CircularScraper:
             return True
         return False
     
-    def fetch_url(self, url, max_attempts=None):
-        """Enhanced URL fetching with multiple fallback strategies"""
-        # Optimize for GitHub Actions - fewer attempts, faster execution
+    def remaining_time(self):
+        """Seconds left before the shared deadline (max_execution_time)"""
+        elapsed = (datetime.now() - self.start_time).total_seconds()
+        return max(0.0, self.max_execution_time - elapsed)
+    
+    def backoff(self, seconds):
+        """Sleep between attempts without overrunning the shared deadline"""
+        time.sleep(min(seconds, self.remaining_time()))
+    
+    def write_metrics(self, **extra):
+        """Append this run's stage timings and counters to metrics/scraper.jsonl"""
+        self.metrics.add_validation(self.validator.stats())
+        return self.metrics.write(**extra)
+    
+    def save_fetch_state(self):
+        """Persist the per-URL latency history and circuit state for the next run"""
+        self.fetch_controller.save()
+        for line in self.fetch_controller.summary():
+            print(f"Fetch policy - {line}")
+    
+    def fetch_url(self, url, max_attempts=None, conditional=True):
+        """Fetch url under the shared fetch policy: circuit breaker, adaptive timeouts, one retry budget"""
         if max_attempts is None:
-            max_attempts = 2 if self.is_github_actions else 3
+            max_attempts = self.fetch_controller.max_attempts
         user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
@@ -122,70 +144,68 @@ class CircularScraper:
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:122.0) Gecko/20100101 Firefox/122.0'
         ]
         
+        # A host that keeps failing is skipped without spending the time budget on it
+        if not self.fetch_controller.allow(url):
+            print(f"Circuit open for {url}, skipping it")
+            self.metrics.count('circuit_skips')
+            return None
+        
         for attempt in range(max_attempts):
+            if self.check_execution_time():
+                print(f"Deadline reached before attempt {attempt + 1} for {url}")
+                break
+            status = None
             try:
-                # Use different user agent for each attempt
-                if attempt < len(user_agents):
-                    self.session.headers['User-Agent'] = user_agents[attempt]
-                
-                # Progressive timeout increases - faster for GitHub Actions
-                if self.is_github_actions:
-                    # Shorter timeouts for GitHub Actions: (20,60), (30,90)
-                    base_connect, base_read = 20, 60
-                    connect_timeout = base_connect + (attempt * 10)
-                    read_timeout = base_read + (attempt * 30)
-                else:
-                    # Normal timeouts for local: (20,90), (35,120), (50,150)
-                    base_connect, base_read = 20, 90
-                    connect_timeout = base_connect + (attempt * 15)
-                    read_timeout = base_read + (attempt * 30)
-                timeout = (connect_timeout, read_timeout)
+                # Use different user agent for each attempt (per request, the session is shared between threads)
+                headers = {'User-Agent': user_agents[attempt % len(user_agents)]}
+                # Revalidate against the cached ETag/Last-Modified when we already have output
+                if conditional and os.path.exists(self.output_file):
+                    headers.update(self.http_cache.conditional_headers(url))
                 
+                # Timeouts follow the host's p50/p95 history and never run past the shared deadline
+                timeout = self.fetch_controller.timeout(url, self.remaining_time())
                 print(f"Attempt {attempt + 1}/{max_attempts} for {url} with timeout {timeout}")
                 
-                # Try with SSL verification disabled and multiple fallback options
-                response = self.session.get(
-                    url, 
-                    timeout=timeout, 
-                    verify=False, 
-                    allow_redirects=True,
-                    stream=False
-                )
+                self.metrics.count('http_requests')
+                if attempt:
+                    self.metrics.count('http_retries')
+                started = time.perf_counter()
+                with self.fetch_controller.host_slot(url), self.metrics.stage('fetch'):
+                    response = self.session.get(
+                        url, 
+                        headers=headers,
+                        timeout=timeout, 
+                        verify=False, 
+                        allow_redirects=True,
+                        stream=False
+                    )
+                status = response.status_code
+                self.metrics.count('bytes_downloaded', len(response.content))
                 
-                if response.status_code == 200:
-                    print(f"Success on attempt {attempt + 1}")
+                if status in (200, 304):
+                    self.fetch_controller.record_success(url, time.perf_counter() - started)
+                    if status == 304:
+                        self.metrics.count('http_not_modified')
+                    print(f"{'Success' if status == 200 else 'Not modified (304)'} on attempt {attempt + 1}")
                     return response
-                else:
-                    print(f"HTTP {response.status_code} on attempt {attempt + 1}")
-                    if attempt < max_attempts - 1:
-                        time.sleep(3 * (attempt + 1))  # Progressive delay
-                        
-            except requests.exceptions.SSLError as e:
-                print(f"SSL error on attempt {attempt + 1}: {e}")
-                if attempt < max_attempts - 1:
-                    time.sleep(5 * (attempt + 1))
-                    
-            except requests.exceptions.ConnectTimeout as e:
-                print(f"Connection timeout on attempt {attempt + 1}: {e}")
-                if attempt < max_attempts - 1:
-                    time.sleep(10 * (attempt + 1))  # Longer delay for connection timeouts
-                    
-            except requests.exceptions.ReadTimeout as e:
-                print(f"Read timeout on attempt {attempt + 1}: {e}")
-                if attempt < max_attempts - 1:
-                    time.sleep(5 * (attempt + 1))
-                    
-            except requests.exceptions.ConnectionError as e:
-                print(f"Connection error on attempt {attempt + 1}: {e}")
-                if attempt < max_attempts - 1:
-                    time.sleep(8 * (attempt + 1))
-                    
+                print(f"HTTP {status} on attempt {attempt + 1}")
+                
+            except requests.exceptions.RequestException as e:
+                print(f"{type(e).__name__} on attempt {attempt + 1}: {e}")
             except Exception as e:
                 print(f"Unexpected error on attempt {attempt + 1}: {e}")
-                if attempt < max_attempts - 1:
-                    time.sleep(5 * (attempt + 1))
+            
+            self.metrics.count('http_failures')
+            if status is None or status in RETRYABLE_STATUSES:
+                self.fetch_controller.record_failure(url)
+            if attempt + 1 >= max_attempts:
+                break
+            delay = self.fetch_controller.retry_delay(url, attempt, self.remaining_time(), status)
+            if delay is None:
+                break
+            self.backoff(delay)
         
-        print(f"All {max_attempts} attempts failed for {url}")
+        print(f"Giving up on {url} after {attempt + 1} attempt(s)")
         return None
     
     def scrape_circulars(self, url):
@@ -196,109 +216,232 @@ class CircularScraper:
         print(f"Scraping {url}...")
         response = self.fetch_url(url)
         
-        if not response:
+        if response is None:
             print(f"Failed to fetch {url}")
             return []
         
+        if os.path.exists(self.output_file) and self.http_cache.is_unchanged(url, response):
+            print(f"Unchanged since last run, skipping parse: {url}")
+            self.unchanged_urls.add(url)
+            self.reached_urls.add(url)
+            self.http_cache.remember(url, response)
+            return []
+        
         try:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            circulars = []
-            
-            # Find table rows containing circular data
-            table_rows = soup.find_all('tr')
-            
-            
             # Process maximum 30 rows for speed in GitHub Actions with 4 URLs
             max_rows = 30 if self.is_github_actions else 100
-            rows_to_process = table_rows[1:max_rows+1]  # Skip header row
+            scan = IncrementalScan(self.known, self.known_stop_after) if self.known else None
             
-            for row in rows_to_process:
-                cells = row.find_all('td')
-                if len(cells) >= 3:
-                    # Simple extraction based on URL type
-                    if any(page_type in url for page_type in ["DVP", "EST", "ACM"]) and len(cells) >= 4:
-                        # DVP/EST/ACM format 
-                        if len(cells) >= 5 and any(page_type in url for page_type in ["EST", "ACM"]):
-                            # 5-column format (EST/ACM): date, circular_no, description, empty, action
-                            date = cells[0].get_text(strip=True)
-                            circular_no = cells[1].get_text(strip=True)
-                            description = cells[2].get_text(strip=True)
-                        else:
-                            # 4-column format (DVP): Skip serial, use date, circular_no, description  
-                            date = cells[1].get_text(strip=True)
-                            circular_no = cells[2].get_text(strip=True)
-                            description = cells[3].get_text(strip=True)
-                        
-                        # Skip header rows
-                        if date.lower() in ['date', 'ದಿನಾಂಕ'] or len(description) < 10:
-                            continue
-                    else:
-                        # Departmental format: date, circular_no, description
-                        date = cells[0].get_text(strip=True)
-                        circular_no = cells[1].get_text(strip=True)
-                        description = cells[2].get_text(strip=True)
-                    
-                    # Simple link extraction
-                    download_link = ""
-                    for cell in cells:
-                        link = cell.find('a')
-                        if link and link.get('href'):
-                            href = link.get('href')
-                            if not any(bad in href for bad in ['atoall.com', 'javascript:', 'webinsight']):
-                                if href.startswith('/'):
-                                    download_link = "https://dtek.karnataka.gov.in" + href
-                                elif href.startswith('http'):
-                                    download_link = href
-                                break
-                    
-                    # Quick validation and add
-                    if (date and description and len(description) > 5 and 
-                        len(date) > 4 and self.is_valid_circular(date, circular_no, description, download_link)):
-                        circulars.append({
-                            'date': date,
-                            'circular_no': circular_no,
-                            'description': description,
-                            'download_link': download_link,
-                            'source_url': url,
-                            'scraped_at': datetime.now().isoformat()
-                        })
+            circulars = self.extract_circulars(url, response.content, max_rows, scan)
             
+            if scan:
+                print(f"Incremental scan of {url}: {scan.summary()}")
             print(f"Successfully extracted {len(circulars)} valid circulars")
+            self.reached_urls.add(url)
+            self.http_cache.remember(url, response)
             return circulars
             
         except Exception as e:
             print(f"Error scraping {url}: {str(e)}")
             return []
     
-    def scrape_all(self):
+    def extract_circulars(self, url, content, max_rows=None, scan=None):
+        """Valid circulars from one listing page, newest first"""
+        with self.metrics.stage('parse'):
+            return self._extract_circulars(url, content, max_rows, scan)
+    
+    def _extract_circulars(self, url, content, max_rows, scan):
+        circulars = []
+        rows_seen = 0
+        
+        # Resolve the page layout once; the row loop below is plain index lookups
+        source = source_for_url(url) or SourceSchema('Unknown', url, layouts={3: (0, 1, 2)})
+        
+        # Stream table rows; only the cells and first acceptable link of each row are kept
+        table_rows = self.row_parser.iter_rows(content, self.validator.is_blocked_href)
+        rows_to_process = islice(table_rows, 1, max_rows+1 if max_rows else None)  # Skip header row
+        
+        for cells, href in rows_to_process:
+            rows_seen += 1
+            columns = source.columns(len(cells))
+            if columns:
+                date, circular_no, description = cells[columns[0]], cells[columns[1]], cells[columns[2]]
+                
+                # Skip header rows
+                if source.is_header(date, description):
+                    continue
+                
+                download_link = source.resolve_link(href)
+                
+                # Validate and add
+                if self.is_valid_circular(date, circular_no, description, download_link):
+                    circulars.append({
+                        'date': date,
+                        'date_iso': date_iso(date),
+                        'circular_no': circular_no,
+                        'description': description,
+                        'download_link': download_link,
+                        'source_url': url,
+                        'scraped_at': datetime.now().isoformat(),
+                        'source': source.name
+                    })
+                    
+                    if scan and scan.seen(circulars[-1]):
+                        print(f"Reached {scan.known_streak} known circulars in a row, stopping early")
+                        break
+        
+        self.metrics.count('rows_seen', rows_seen)
+        return circulars
+    
+    def scrape_source(self, url):
+        """Scrape one source and record its wall-clock time"""
+        started = time.monotonic()
+        circulars = self.scrape_circulars(url)
+        self.source_timings[url] = time.monotonic() - started
+        return circulars
+    
+    def load_known(self):
+        """Keys already present in circulars.json and the micro-scraper files"""
+        filenames = [self.output_file] + sorted(glob.glob('data_*.json'))
+        self.known = KnownCirculars.from_files(filenames)
+        print(f"Incremental mode: {len(self.known)} known circulars")
+    
+    def checkpoint_source(self, circulars):
+        """Upsert one source's results as soon as they arrive, so a killed run keeps them"""
+        if circulars:
+            self.checkpointed += self.get_store().upsert(circulars)
+    
+    def scrape_all(self, concurrent=True):
         all_circulars = []
         
-        # Always use sequential scraping for reliability
-        for url in self.urls:
-            if self.check_execution_time():
-                print("Time limit reached, stopping")
-                break
-                
-            circulars = self.scrape_circulars(url)
-            all_circulars.extend(circulars)
-            print(f"Found {len(circulars)} circulars from {url}")
+        if self.incremental:
+            self.load_known()
+        
+        if concurrent:
+            # Fetch all sources at once; total time is roughly that of the slowest page
+            results = {}
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {executor.submit(self.scrape_source, url): url for url in self.urls}
+                for future in as_completed(futures):
+                    url = futures[future]
+                    try:
+                        results[url] = future.result()
+                    except Exception as e:
+                        print(f"Error scraping {url}: {e}")
+                        results[url] = []
+                    print(f"Found {len(results[url])} circulars from {url}")
+                    self.checkpoint_source(results[url])
             
-            # Small delay between URLs
-            if len(self.urls) > 1:
-                time.sleep(2)
+            # Keep source order stable for deduplication
+            for url in self.urls:
+                all_circulars.extend(results.get(url, []))
+        else:
+            for url in self.urls:
+                if self.check_execution_time():
+                    print("Time limit reached, stopping")
+                    break
+                    
+                circulars = self.scrape_source(url)
+                all_circulars.extend(circulars)
+                print(f"Found {len(circulars)} circulars from {url}")
+                self.checkpoint_source(circulars)
+                
+                # Small delay between URLs
+                if len(self.urls) > 1:
+                    time.sleep(2)
+        
+        print("Per-source timing:")
+        for url in self.urls:
+            if url in self.source_timings:
+                print(f"  - {url}: {self.source_timings[url]:.1f}s")
         
-        # Remove duplicates based on circular_no and description
+        # Remove duplicates based on the normalized circular_no and description
+        self.metrics.count('rows_scraped', len(all_circulars))
         seen = set()
         unique_circulars = []
         for circular in all_circulars:
-            key = (circular['circular_no'], circular['description'])
+            key = circular_key(circular)
             if key not in seen:
                 seen.add(key)
                 unique_circulars.append(circular)
         
         print(f"Total unique circulars after deduplication: {len(unique_circulars)}")
+        self.validator.report()
         return unique_circulars
     
+    def pagination_urls(self, url, content):
+        """URLs of the listing pages after the first, from the ?page=N pagination links"""
+        text = content.decode('utf-8', errors='replace')
+        last_page, template = 1, None
+        for href, number in PAGE_LINK.findall(text):
+            if int(number) > last_page:
+                last_page, template = int(number), html.unescape(href)
+        if template is None:
+            return []
+        template = urljoin(url, template)
+        return [PAGE_NUMBER.sub(rf'\g<1>{page}', template) for page in range(2, last_page + 1)]
+    
+    def load_checkpoint(self):
+        try:
+            if os.path.exists(self.checkpoint_file):
+                with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Could not load backfill checkpoint: {e}")
+        return {}
+    
+    def save_checkpoint(self, checkpoint):
+        write_json(self.checkpoint_file, checkpoint)
+    
+    def backfill(self, max_pages=None, restart=False):
+        """Crawl every listing page of every source into the append-only archive store.
+        
+        Progress is checkpointed per page, so an interrupted crawl resumes where it stopped.
+        """
+        checkpoint = {} if restart else self.load_checkpoint()
+        store = self.get_store()
+        total_added = 0
+        
+        for url in self.urls:
+            if self.check_execution_time():
+                break
+            
+            state = checkpoint.get(url)
+            if state is None:
+                # First page tells us how many pages there are
+                response = self.fetch_url(url, conditional=False)
+                if response is None or response.status_code != 200:
+                    print(f"Backfill: could not fetch first page of {url}")
+                    continue
+                pages = [url] + self.pagination_urls(url, response.content)
+                if max_pages:
+                    pages = pages[:max_pages]
+                state = checkpoint[url] = {'pages': pages, 'done': []}
+                total_added += store.insert_missing(self.extract_circulars(url, response.content))
+                state['done'].append(url)
+                self.save_checkpoint(checkpoint)
+            
+            remaining = [page for page in state['pages'] if page not in state['done']]
+            print(f"Backfill {url}: {len(state['done'])}/{len(state['pages'])} pages done, {len(remaining)} to go")
+            
+            with ThreadPoolExecutor(max_workers=self.backfill_workers) as executor:
+                futures = {executor.submit(self.fetch_url, page, None, False): page for page in remaining}
+                for future in as_completed(futures):
+                    page = futures[future]
+                    response = future.result()
+                    if response is None or response.status_code != 200:
+                        # Left out of 'done' so the next run retries it
+                        continue
+                    # Older pages only add circulars, never overwrite newer copies
+                    total_added += store.insert_missing(self.extract_circulars(url, response.content))
+                    state['done'].append(page)
+                    self.save_checkpoint(checkpoint)
+        
+        complete = all(len(state['done']) == len(state['pages']) for state in checkpoint.values())
+        print(f"Backfill added {total_added} circulars, archive holds {store.count()}"
+              f"{'' if complete else ' (incomplete, run again to resume)'}")
+        return total_added
+    
     def load_existing_data(self, filename='circulars.json'):
         """Load existing circulars data if available"""
         try:
@@ -310,100 +453,79 @@ class CircularScraper:
             print(f"Error loading existing data: {e}")
         return []
     
+    def get_store(self, filename='circulars.json'):
+        """Persistent circular store, seeded from the JSON output on first use"""
+        if self.store is None:
+            self.store = CircularStore()
+            self.store.bootstrap([filename])
+        return self.store
+    
     def merge_with_existing_data(self, new_circulars, filename='circulars.json'):
-        """Merge new circulars with existing data and return combined list"""
-        existing_circulars = self.load_existing_data(filename)
-        
-        # Combine new and existing circulars
-        all_circulars = new_circulars + existing_circulars
-        
-        # Remove duplicates based on circular_no and description
-        seen = set()
-        unique_circulars = []
-        for circular in all_circulars:
-            key = (circular.get('circular_no', ''), circular.get('description', ''))
-            if key not in seen and key != ('', ''):
-                seen.add(key)
-                unique_circulars.append(circular)
-        
-        print(f"Merged {len(new_circulars)} new + {len(existing_circulars)} existing = {len(unique_circulars)} unique circulars")
-        return unique_circulars
+        """Upsert new circulars into the store and return the newest candidates of each source"""
+        store = self.get_store(filename)
+        # Upserting again puts the whole run in one batch, in dedup order
+        added = store.upsert(new_circulars) + self.checkpointed
+        # A few spare candidates per source keep the window full once near-duplicates are folded
+        candidates = store.recent_by_source([source.key for source in SOURCES], 120)
+        
+        print(f"Merged {len(new_circulars)} scraped ({added} new) into store of {store.count()} circulars")
+        return candidates
+    
+    def source_status(self, circulars, previous):
+        """Freshness tier per source key: fresh if its page was reached, else by when it last was"""
+        reached = {source_for_url(url).key for url in self.reached_urls if source_for_url(url)}
+        counts = {}
+        for circular in circulars:
+            key = source_key_for(circular)
+            counts[key] = counts.get(key, 0) + 1
+        now = datetime.now().isoformat()
+        status = {}
+        for source in SOURCES:
+            if source.key in reached:
+                tier, as_of = FRESH, now
+            else:
+                as_of = previous.get(source.key, {}).get('as_of')
+                age = age_hours(as_of)
+                tier = CACHED if age is not None and age < source.snapshot_ttl_hours else STALE
+            status[source.key] = {'tier': tier, 'as_of': as_of, 'records': counts.get(source.key, 0)}
+            self.metrics.count(f"sources_{tier}")
+        return status
     
     def save_to_json(self, circulars, filename='circulars.json'):
-        def parse_date(date_str):
-            try:
-                # Handle various date formats
-                date_str = date_str.strip()
-                
-                # DD/MM/YYYY or DD-MM-YYYY
-                if '/' in date_str:
-                    parts = date_str.split('/')
-                    if len(parts) == 3:
-                        return datetime(int(parts[2]), int(parts[1]), int(parts[0]))
-                elif '-' in date_str:
-                    parts = date_str.split('-')
-                    if len(parts) == 3:
-                        # Handle DD-MM-YYYY
-                        if len(parts[2]) == 4:
-                            return datetime(int(parts[2]), int(parts[1]), int(parts[0]))
-                        # Handle YYYY-MM-DD
-                        elif len(parts[0]) == 4:
-                            return datetime(int(parts[0]), int(parts[1]), int(parts[2]))
-                
-                # Fallback - return very old date for unparseable dates
-                return datetime(1900, 1, 1)
-            except:
-                return datetime(1900, 1, 1)
-        
+        # One writer at a time: an overlapping run waits instead of interleaving its outputs
+        with file_lock(filename):
+            return self._save_to_json(circulars, filename)
+    
+    def _save_to_json(self, circulars, filename):
         # Merge with existing data first
-        all_circulars = self.merge_with_existing_data(circulars, filename)
-        
-        # Sort by parsed date, newest first
-        all_circulars.sort(key=lambda x: parse_date(x['date']), reverse=True)
-        
-        # Ensure balanced representation from all sources
-        dept_circulars = [c for c in all_circulars if 'Departmental' in c['source_url']]
-        dvp_circulars = [c for c in all_circulars if 'DVP' in c['source_url']]
-        est_circulars = [c for c in all_circulars if 'EST' in c['source_url']]
-        acm_circulars = [c for c in all_circulars if 'ACM' in c['source_url']]
-        
-        # Take top 100 from each source to ensure representation
-        selected_circulars = (dept_circulars[:100] + dvp_circulars[:100] + 
-                            est_circulars[:100] + acm_circulars[:100])
-        
-        # Sort combined selection by date again
-        selected_circulars.sort(key=lambda x: parse_date(x['date']), reverse=True)
-        
-        # Take top 400 total, but this ensures we have mix from all sources
-        final_circulars = selected_circulars[:400]
-        
-        # Count by source for reporting
-        final_dept_count = sum(1 for c in final_circulars if 'Departmental' in c['source_url'])
-        final_dvp_count = sum(1 for c in final_circulars if 'DVP' in c['source_url'])
-        final_est_count = sum(1 for c in final_circulars if 'EST' in c['source_url'])
-        final_acm_count = sum(1 for c in final_circulars if 'ACM' in c['source_url'])
-        
-        data = {
-            'last_updated': datetime.now().isoformat(),
-            'total_circulars': len(final_circulars),
-            'circulars': final_circulars,
-            'scraping_status': 'success' if circulars else 'partial',
-            'source_breakdown': {
-                'departmental': final_dept_count,
-                'dvp': final_dvp_count,
-                'est': final_est_count,
-                'acm': final_acm_count
-            }
-        }
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        with self.metrics.stage('merge'):
+            all_circulars = self.merge_with_existing_data(circulars, filename)
+        
+        # Fold copies the store keeps apart (small edits to the same posting) before selecting
+        with self.metrics.stage('dedup'):
+            all_circulars, self.near_duplicates = report_near_duplicates(all_circulars, 'candidates')
+        self.metrics.count('near_duplicates_merged', sum(len(cluster['merged']) for cluster in self.near_duplicates))
+        
+        # Newest 100 per source, merged into the top 400 overall, ensuring a mix from all sources
+        with self.metrics.stage('select'):
+            final_circulars, source_breakdown = select_recent(all_circulars, per_source=100, total=400)
+        
+        sources = self.source_status(circulars, load_status().get('sources', {}))
+        _, status = publish_all(
+            final_circulars, self.store, sources,
+            document={
+                'scraping_status': 'success' if circulars else 'partial',
+                'source_breakdown': source_breakdown,
+            },
+            status_fields={'near_duplicates': cluster_summary(self.near_duplicates)},
+            fresh_circulars=circulars, output_file=filename, metrics=self.metrics)
+        if not status['changed']:
+            return False
         
         print(f"Saved {len(final_circulars)} total circulars to {filename}")
-        print(f"  - Departmental: {final_dept_count}")
-        print(f"  - DVP: {final_dvp_count}")
-        print(f"  - EST: {final_est_count}")
-        print(f"  - ACM: {final_acm_count}")
+        for source in SOURCES:
+            print(f"  - {source.name}: {source_breakdown[source.key]}")
+        return True
 
 def signal_handler(signum, frame):
     print(f"\nReceived signal {signum}. Gracefully shutting down...")
@@ -414,28 +536,55 @@ def main():
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
     
+    parser = argparse.ArgumentParser(description="Scrape DTE Karnataka circulars")
+    parser.add_argument('--backfill', action='store_true',
+                        help='crawl all listing pages into the archive store (resumable)')
+    parser.add_argument('--max-pages', type=int, default=None, help='limit pages per source when backfilling')
+    parser.add_argument('--restart', action='store_true', help='ignore the backfill checkpoint')
+    args = parser.parse_args()
+    
     scraper = CircularScraper()
     time_limit = scraper.max_execution_time
     env_info = "GitHub Actions" if scraper.is_github_actions else "local"
     print(f"Starting enhanced scraper with {time_limit}s time limit ({env_info} environment)...")
     
+    if args.backfill:
+        # Full history goes to the archive; circulars.json keeps the recent window
+        scraper.backfill(max_pages=args.max_pages, restart=args.restart)
+        scraper.save_fetch_state()
+        # Published through the normal path, so the search index covers the crawled history
+        written = scraper.save_to_json([])
+        scraper.store.close()
+        scraper.write_metrics(mode='backfill', outcome='written' if written else 'unchanged')
+        return
+    
     # Try scraping
     circulars = scraper.scrape_all()
+    scraper.save_fetch_state()
     
     elapsed_time = (datetime.now() - scraper.start_time).total_seconds()
     print(f"Scraping completed in {elapsed_time:.1f}s")
     
+    # Nothing changed upstream: keep circulars.json as it is
+    if scraper.unchanged_urls and len(scraper.unchanged_urls) == len(scraper.urls):
+        print("All sources unchanged since last run. Skipping rewrite.")
+        scraper.http_cache.save()
+        scraper.write_metrics(mode='scrape', outcome='unchanged')
+        print("Scraper execution completed.")
+        return
+    
     # Always save, even if we got partial results
+    written = True
     if circulars:
         print(f"Successfully scraped {len(circulars)} new circulars")
-        scraper.save_to_json(circulars)
+        written = scraper.save_to_json(circulars)
     else:
         print("No new circulars found this run.")
-        # Still try to merge with existing and update timestamp
-        existing_circulars = scraper.load_existing_data()
-        if existing_circulars:
-            print(f"Maintaining {len(existing_circulars)} existing circulars")
-            scraper.save_to_json([])  # This will merge with existing
+        # Still try to merge with existing; skipped if the content is unchanged
+        existing_count = scraper.get_store().count()
+        if existing_count:
+            print(f"Maintaining {existing_count} existing circulars")
+            written = scraper.save_to_json([])  # This will merge with existing
         else:
             print("No existing data found either. Creating minimal file.")
             data = {
@@ -445,9 +594,18 @@ def main():
                 'scraping_status': 'failed',
                 'note': 'All scraping attempts failed'
             }
-            with open('circulars.json', 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            with file_lock('circulars.json'):
+                write_json('circulars.json', data)
     
+    # Only record validators once the output has been written
+    scraper.http_cache.save()
+    if scraper.store:
+        scraper.store.close()
+    if not written:
+        outcome = 'unchanged'
+    else:
+        outcome = 'written' if circulars else 'no_new_circulars'
+    scraper.write_metrics(mode='scrape', outcome=outcome)
     print("Scraper execution completed.")
 
 if __name__ == "__main__":
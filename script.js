@@ -80,7 +80,7 @@ function showSuccess(message) {
     }, 5000);
 }
 
-function displayCirculars(circulars, timestamp) {
+function displayCirculars(circulars, timestamp, summary, sectionAge) {
     const circularsDiv = document.getElementById('circulars');
     const statsDiv = document.getElementById('stats');
     const noResultsDiv = document.getElementById('no-results');
@@ -94,8 +94,9 @@ function displayCirculars(circulars, timestamp) {
     // Show stats
     const lastUpdated = timestamp ? new Date(timestamp).toLocaleString('en-IN') : new Date().toLocaleString('en-IN');
     statsDiv.innerHTML = `
-        <strong>📊 ${circulars.length} circulars loaded</strong> | 
+        <strong>📊 ${summary || `${circulars.length} circulars loaded`}</strong> | 
         <strong>🕒 Last updated:</strong> ${lastUpdated} |
+        ${sectionAge ? `<strong>🗂️ Section data:</strong> ${sectionAge} |` : ''}
         <strong>🤖 Auto-refreshed:</strong> Every 30 minutes
     `;
     statsDiv.style.display = 'block';
@@ -103,8 +104,9 @@ function displayCirculars(circulars, timestamp) {
 
     // Display circulars
     const circularsHtml = circulars.map((circular, index) => {
-        // Determine the header class based on category
-        const headerClass = currentCategory.toLowerCase();
+        // Search results carry their own category, tab listings use the current one
+        const category = circular.category || currentCategory;
+        const headerClass = category.toLowerCase();
         
         // Create clean title
         let cleanTitle = circular.description || circular.title || 'No title available';
@@ -134,14 +136,20 @@ function displayCirculars(circulars, timestamp) {
                 <div class="meta-item">
                     <span>🏛️</span>
                     <span>Section: </span>
-                    <span class="meta-section">${getSectionName(currentCategory)}</span>
+                    <span class="meta-section">${getSectionName(category)}</span>
                 </div>
+                ${circular.freshness && circular.freshness !== 'fresh' ? `
+                <div class="meta-item meta-freshness ${escapeHtml(circular.freshness)}">
+                    <span>⏳</span>
+                    <span>${FRESHNESS_LABELS[circular.freshness] || escapeHtml(circular.freshness)}</span>
+                </div>
+                ` : ''}
             </div>
             <div class="circular-actions">
-                <a href="${generatePDFLink(circular, currentCategory)}" target="_blank" class="circular-link">
+                <a href="${generatePDFLink(circular, category)}" target="_blank" class="circular-link">
                     ${(circular.download_link && circular.download_link !== '' && !circular.download_link.includes('atoall.com')) ? '📄 View PDF' : '🌐 View Source'}
                 </a>
-                <button onclick="shareCircular('${circular.download_link || ''}', '${escapeHtml(cleanTitle)}', '${escapeHtml(circular.date || '')}', '${escapeHtml(circular.circular_no || '')}', '${currentCategory}')" class="share-btn">
+                <button onclick="shareCircular('${circular.download_link || ''}', '${escapeHtml(cleanTitle)}', '${escapeHtml(circular.date || '')}', '${escapeHtml(circular.circular_no || '')}', '${category}')" class="share-btn">
                     🔗 Share
                 </button>
             </div>
@@ -403,58 +411,166 @@ function changeCategory(category) {
     }
     
     currentCategory = category;
+    document.getElementById('searchInput').value = '';
     loadCirculars();
 }
 
+// Rebuild records from the dictionary-encoded publish format (publish.py)
+function decodeCompact(compact) {
+    if (compact.format !== 'circulars-compact/1') {
+        return compact;
+    }
+    const { fields, tables, link_prefix: linkPrefix } = compact;
+    const circulars = compact.rows.map(row => {
+        const circular = {};
+        fields.forEach((field, i) => {
+            let value = row[i];
+            if (value === null || value === undefined) return;
+            if (tables[field]) {
+                value = tables[field][value];
+            } else if (field === 'download_link' && value && !value.includes('://')) {
+                value = linkPrefix + value;
+            }
+            circular[field] = value;
+        });
+        if (row.length > fields.length) {
+            Object.assign(circular, row[fields.length]);
+        }
+        return circular;
+    });
+    return { ...compact, circulars };
+}
+
+// Parsed shards by category, reused while their manifest hash is unchanged
+const shardCache = {};
+
+async function loadShard(category) {
+    const key = category.toLowerCase();
+    const manifestResponse = await fetch('shards/manifest.json', { cache: 'no-cache' });
+    if (!manifestResponse.ok) {
+        throw new Error(`Failed to load shard manifest (${manifestResponse.status})`);
+    }
+    const manifest = await manifestResponse.json();
+    const entry = manifest.shards && manifest.shards[key];
+    if (!entry) {
+        throw new Error(`No shard for ${category}`);
+    }
+
+    const cached = shardCache[key];
+    if (cached && cached.sha256 === entry.sha256) {
+        return cached.data;
+    }
+
+    // The hash in the URL lets the browser cache each shard until it changes
+    const response = await fetch(`shards/${entry.file}?v=${entry.sha256.slice(0, 12)}`);
+    if (!response.ok) {
+        throw new Error(`Failed to load ${category} shard (${response.status})`);
+    }
+    const data = decodeCompact(await response.json());
+    shardCache[key] = { sha256: entry.sha256, data };
+    return data;
+}
+
+// Fallback when shards are unavailable: classify the full data set here
+function filterCategory(circulars, category) {
+    const hasDvpNumber = circular =>
+        circular.circular_no?.includes('ಡಿವಿಪಿ') || circular.circular_no?.includes('DVP');
+
+    if (category === 'Departmental') {
+        // Everything except DVP circulars
+        return circulars.filter(circular => !hasDvpNumber(circular));
+    } else if (category === 'DVP') {
+        // DVP circulars based on source URL, circular number or link patterns
+        return circulars.filter(circular =>
+            (circular.source_url && circular.source_url.includes('Circulars/DVP')) ||
+            hasDvpNumber(circular) ||
+            circular.download_link?.includes('/DVP/')
+        );
+    } else if (category === 'EST') {
+        return circulars.filter(circular =>
+            circular.source_url && circular.source_url.includes('Circulars/EST')
+        );
+    } else if (category === 'ACM') {
+        return circulars.filter(circular =>
+            circular.source_url && circular.source_url.includes('Circulars/ACM')
+        );
+    }
+    return circulars;
+}
+
+async function loadCategoryData(category) {
+    try {
+        return await loadShard(category);
+    } catch (error) {
+        console.warn('Shard load failed, falling back to the full data set:', error);
+    }
+
+    // Load circulars data from the compact file, or the readable one if it is missing
+    let response = await fetch('circulars.min.json');
+    if (!response.ok) {
+        response = await fetch('circulars.json');
+    }
+    
+    if (!response.ok) {
+        throw new Error(`Failed to load circulars data (${response.status})`);
+    }
+    
+    const data = decodeCompact(await response.json());
+    return {
+        last_updated: data.last_updated,
+        circulars: filterCategory(data.circulars || [], category)
+    };
+}
+
+// Freshness tiers set by merge_data.py / scraper.py (snapshots.py)
+const FRESHNESS_LABELS = { fresh: 'Live', cached: 'Cached copy', stale: 'Stale' };
+
+// Per-source tier and last-fresh time; status.json is small and rewritten every run
+async function loadSourceStatus() {
+    try {
+        const response = await fetch('status.json', { cache: 'no-cache' });
+        if (!response.ok) {
+            return {};
+        }
+        const status = await response.json();
+        return status.sources || {};
+    } catch (error) {
+        console.warn('Could not load status.json:', error);
+        return {};
+    }
+}
+
+function formatAge(timestamp) {
+    const minutes = Math.round((Date.now() - new Date(timestamp).getTime()) / 60000);
+    if (!timestamp || isNaN(minutes)) {
+        return 'age unknown';
+    }
+    if (minutes < 60) {
+        return `${Math.max(minutes, 0)} min old`;
+    }
+    const hours = Math.round(minutes / 60);
+    return hours < 48 ? `${hours} h old` : `${Math.round(hours / 24)} days old`;
+}
+
+function describeSectionAge(sources, category) {
+    const entry = sources[category.toLowerCase()];
+    if (!entry) {
+        return '';
+    }
+    return `${FRESHNESS_LABELS[entry.tier] || escapeHtml(entry.tier)}, ${formatAge(entry.as_of)}`;
+}
+
 async function loadCirculars() {
     if (isLoading) return;
 
     showLoading();
 
     try {
-        // Load circulars data from our JSON file
-        const response = await fetch('circulars.json');
-        
-        if (!response.ok) {
-            throw new Error(`Failed to load circulars data (${response.status})`);
-        }
-        
-        const data = await response.json();
-        
-        // Filter circulars based on current category
-        let filteredCirculars = data.circulars || [];
-        
-        if (currentCategory === 'Departmental') {
-            filteredCirculars = filteredCirculars.filter(circular => 
-                // Include Departmental circulars and exclude DVP circulars
-                (circular.source_url && circular.source_url.includes('Departmental+Circulars')) ||
-                (!circular.circular_no?.includes('ಡಿವಿಪಿ') && !circular.circular_no?.includes('DVP'))
-            );
-            // Remove DVP circulars from Departmental category
-            filteredCirculars = filteredCirculars.filter(circular => 
-                !circular.circular_no?.includes('ಡಿವಿಪಿ') && !circular.circular_no?.includes('DVP')
-            );
-        } else if (currentCategory === 'DVP') {
-            filteredCirculars = filteredCirculars.filter(circular => 
-                // Include DVP circulars based on source URL or circular number patterns
-                (circular.source_url && circular.source_url.includes('Circulars/DVP')) ||
-                circular.circular_no?.includes('ಡಿವಿಪಿ') || 
-                circular.circular_no?.includes('DVP') ||
-                circular.download_link?.includes('/DVP/')
-            );
-        } else if (currentCategory === 'EST') {
-            filteredCirculars = filteredCirculars.filter(circular => 
-                // Include EST circulars based on source URL
-                circular.source_url && circular.source_url.includes('Circulars/EST')
-            );
-        } else if (currentCategory === 'ACM') {
-            filteredCirculars = filteredCirculars.filter(circular => 
-                // Include ACM circulars based on source URL
-                circular.source_url && circular.source_url.includes('Circulars/ACM')
-            );
-        }
+        // Only the current tab's pre-classified slice is downloaded
+        const [data, sources] = await Promise.all([loadCategoryData(currentCategory), loadSourceStatus()]);
+        const filteredCirculars = data.circulars || [];
 
-        displayCirculars(filteredCirculars, data.last_updated);
+        displayCirculars(filteredCirculars, data.last_updated, null, describeSectionAge(sources, currentCategory));
         
         if (filteredCirculars.length > 0) {
             showSuccess(`✅ Successfully loaded ${filteredCirculars.length} ${currentCategory.toLowerCase()} circulars!`);
@@ -467,6 +583,181 @@ async function loadCirculars() {
     }
 }
 
+// Search over the prebuilt index from search_index.py, loaded on first use
+const SOURCE_CATEGORIES = { departmental: 'Departmental', dvp: 'DVP', est: 'EST', acm: 'ACM' };
+const KANNADA_DIGITS = '೦೧೨೩೪೫೬೭೮೯';
+let searchIndexPromise = null;
+let searchTimer = null;
+
+// Must match search_index.normalize()
+function normalizeSearchText(text) {
+    return (text || '').normalize('NFC')
+        .replace(/[\u200b\u200c\u200d\u2060\ufeff]/g, '')
+        .replace(/[೦-೯]/g, digit => String(KANNADA_DIGITS.indexOf(digit)))
+        .toLowerCase();
+}
+
+function searchTokens(text) {
+    return normalizeSearchText(text).match(/[0-9a-z\u0C80-\u0CFF]+/g) || [];
+}
+
+function loadSearchIndex() {
+    if (!searchIndexPromise) {
+        searchIndexPromise = fetch('search_index.json')
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`Failed to load search index (${response.status})`);
+                }
+                return response.json();
+            })
+            .then(async index => ({
+                ...index,
+                docs: await resolveSearchDocs(index),
+                vocabulary: Object.keys(index.tokens).sort(),
+                texts: []
+            }))
+            .catch(error => {
+                searchIndexPromise = null;
+                throw error;
+            });
+    }
+    return searchIndexPromise;
+}
+
+// Record per doc id: window circulars from their shard rows, the rest from the index itself
+async function resolveSearchDocs(index) {
+    const archiveDocs = decodeCompact(index.docs).circulars
+        .map(doc => ({ ...doc, category: SOURCE_CATEGORIES[doc.source] }));
+    if (index.format !== 'circulars-search/2') {
+        // Older indexes carry every doc themselves
+        return archiveDocs;
+    }
+    const manifestResponse = await fetch('shards/manifest.json', { cache: 'no-cache' });
+    const manifest = manifestResponse.ok ? await manifestResponse.json() : {};
+    const shardRows = {};
+    await Promise.all(Object.entries(index.layouts).map(async ([key, layout]) => {
+        const entry = manifest.shards && manifest.shards[key];
+        // Rows moved since the index was built (a streaming merge): skip them until it is rebuilt
+        if (!entry || entry.layout !== layout) {
+            console.warn(`Search index predates the ${key} shard, its circulars are left out`);
+            return;
+        }
+        const data = await loadShard(key);
+        shardRows[key] = data.circulars.map(circular => ({ ...circular, category: SOURCE_CATEGORIES[key] }));
+    }));
+    return index.refs.map(ref => Array.isArray(ref)
+        ? (shardRows[ref[0]] ? shardRows[ref[0]][ref[1]] : null)
+        : archiveDocs[ref]);
+}
+
+function intersectSorted(a, b) {
+    const result = [];
+    let i = 0, j = 0;
+    while (i < a.length && j < b.length) {
+        if (a[i] === b[j]) {
+            result.push(a[i]);
+            i++;
+            j++;
+        } else if (a[i] < b[j]) {
+            i++;
+        } else {
+            j++;
+        }
+    }
+    return result;
+}
+
+function lowerBound(sorted, value) {
+    let low = 0, high = sorted.length;
+    while (low < high) {
+        const mid = (low + high) >> 1;
+        if (sorted[mid] < value) low = mid + 1; else high = mid;
+    }
+    return low;
+}
+
+// Sorted doc ids that may contain term: trigram postings, or token prefixes for short terms
+function termCandidates(index, term) {
+    const size = index.gram_size;
+    if (term.length >= size) {
+        let result = null;
+        for (let i = 0; i + size <= term.length; i++) {
+            const postings = index.grams[term.slice(i, i + size)];
+            if (!postings) return [];
+            result = result ? intersectSorted(result, postings) : postings;
+        }
+        return result;
+    }
+    const ids = new Set();
+    for (let i = lowerBound(index.vocabulary, term);
+         i < index.vocabulary.length && index.vocabulary[i].startsWith(term); i++) {
+        index.tokens[index.vocabulary[i]].forEach(id => ids.add(id));
+    }
+    return [...ids].sort((a, b) => a - b);
+}
+
+function searchText(index, id) {
+    if (index.texts[id] === undefined) {
+        const doc = index.docs[id];
+        index.texts[id] = normalizeSearchText(`${doc.description} ${doc.circular_no} ${doc.pdf_excerpt || ''}`);
+    }
+    return index.texts[id];
+}
+
+// Circulars matching every query term, whole-word matches first, then newest first
+function searchCirculars(index, query, limit = 100) {
+    const terms = [...new Set(searchTokens(query))];
+    if (terms.length === 0) return [];
+
+    let candidates = null;
+    for (const term of terms) {
+        const ids = termCandidates(index, term);
+        candidates = candidates ? intersectSorted(candidates, ids) : ids;
+        if (candidates.length === 0) return [];
+    }
+
+    // Trigrams only narrow the set down; confirm each term really occurs
+    const matches = candidates.filter(id =>
+        index.docs[id] && terms.every(term => searchText(index, id).includes(term)));
+    const exact = terms.map(term => new Set(index.tokens[term] || []));
+    const scored = matches.map(id => ({ id, score: exact.filter(ids => ids.has(id)).length }));
+    scored.sort((a, b) => b.score - a.score || a.id - b.id);
+
+    return scored.slice(0, limit).map(({ id }) => ({
+        ...index.docs[id],
+        category: index.docs[id].category || currentCategory
+    }));
+}
+
+function onSearchInput() {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(runSearch, 150);
+}
+
+async function runSearch() {
+    const query = document.getElementById('searchInput').value.trim();
+    if (!query) {
+        loadCirculars();
+        return;
+    }
+
+    try {
+        const index = await loadSearchIndex();
+        const started = performance.now();
+        const results = searchCirculars(index, query);
+        const elapsed = performance.now() - started;
+
+        document.getElementById('circulars').innerHTML = '';
+        document.getElementById('no-results').style.display = 'none';
+        document.getElementById('stats').style.display = 'none';
+        displayCirculars(results, index.generated_at,
+            `${results.length} matches for "${escapeHtml(query)}" in ${elapsed.toFixed(1)} ms`);
+    } catch (error) {
+        showError(`Search is unavailable: ${error.message}`);
+        console.error('Search error:', error);
+    }
+}
+
 // Share Circular Functionality
 function shareCircular(pdfUrl, title, date, orderNumber, category) {
     const categoryName = getSectionName(category);
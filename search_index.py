@@ -0,0 +1,128 @@
+"""
+Prebuilt client-side search index over the circular archive.
+Descriptions, circular numbers and PDF excerpts are normalized (NFC,
+zero-width joiners removed, Kannada digits folded, lowercased) and split
+into [0-9a-z + Kannada block] tokens. The index maps every token and every
+character trigram of a token to the documents containing it, so
+script.js can answer whole-word, prefix and partial queries with a few
+posting-list intersections instead of scanning every description.
+
+Records of the published window are not copied into the index: their
+doc ref is a [shard, row] pair into shards/<key>.min.json, valid while
+the shard's layout (recorded here and in the manifest) is unchanged.
+Only archive records outside the window carry their own docs.
+"""
+
+import json
+import re
+import unicodedata
+from datetime import datetime
+
+from circular_store import store_key
+from dedup import FOLD, FOLD_CHARS
+from publish import encode_compact, write_precompressed
+from shards import shard_layout, split_categories
+from sources import source_key_for
+
+SEARCH_FORMAT = 'circulars-search/2'
+SEARCH_INDEX_FILE = 'search_index.json'
+
+GRAM_SIZE = 3
+
+TOKEN = re.compile(r'[0-9a-z\u0C80-\u0CFF]+')
+
+
+def normalize(text):
+    """Search form of text; script.js normalizeSearchText() must match"""
+    text = unicodedata.normalize('NFC', text or '')
+    if FOLD_CHARS.search(text):
+        text = text.translate(FOLD)
+    return text.lower()
+
+
+def tokenize(text):
+    return TOKEN.findall(normalize(text))
+
+
+def grams(token, size=GRAM_SIZE):
+    """Distinct character n-grams of a token (none for tokens shorter than size)"""
+    return {token[i:i + size] for i in range(len(token) - size + 1)}
+
+
+def shard_refs(shards):
+    """{store key: (shard, row)} for split_categories() output, a record's own source shard preferred"""
+    refs = {}
+    for shard, circulars in shards.items():
+        for row, circular in enumerate(circulars):
+            key = store_key(circular)
+            if key is not None and (key not in refs or source_key_for(circular) == shard):
+                refs[key] = (shard, row)
+    return refs
+
+
+def build_index(circulars, window=()):
+    """Index document for circulars, kept in the given (newest first) order.
+
+    Records also in window (the published circulars.json) are referenced in
+    its shards instead of being copied.
+    """
+    refs = []
+    docs = []
+    layouts = {}
+    shards = split_categories(window)
+    window_refs = shard_refs(shards)
+    tokens = {}
+    trigrams = {}
+    for doc_id, circular in enumerate(circulars):
+        ref = window_refs.get(store_key(circular))
+        if ref is not None:
+            if ref[0] not in layouts:
+                layouts[ref[0]] = shard_layout(shards[ref[0]])
+            refs.append(list(ref))
+        else:
+            refs.append(len(docs))
+            docs.append({
+                'date': circular.get('date', ''),
+                'circular_no': circular.get('circular_no', ''),
+                'description': circular.get('description', ''),
+                'download_link': circular.get('download_link', ''),
+                'source': source_key_for(circular) or '',
+            })
+            if circular.get('pdf_excerpt'):
+                docs[-1]['pdf_excerpt'] = circular['pdf_excerpt']
+        doc_tokens = set(tokenize(circular.get('description', ''))) | set(tokenize(circular.get('circular_no', '')))
+        if circular.get('pdf_excerpt'):
+            # Text extracted from the PDF (pdf_text.py) is searchable too
+            doc_tokens |= set(tokenize(circular['pdf_excerpt']))
+        for token in doc_tokens:
+            tokens.setdefault(token, []).append(doc_id)
+            for gram in grams(token):
+                postings = trigrams.setdefault(gram, [])
+                # A trigram can occur in several tokens of the same document
+                if not postings or postings[-1] != doc_id:
+                    postings.append(doc_id)
+
+    return {
+        'format': SEARCH_FORMAT,
+        'generated_at': datetime.now().isoformat(),
+        'gram_size': GRAM_SIZE,
+        # Per doc id: [shard, row] into shards/<shard>.min.json, or a position in docs
+        'refs': refs,
+        'layouts': layouts,
+        # Archive records outside the window, in the compact publish encoding (decodeCompact())
+        'docs': encode_compact({'circulars': docs}),
+        # Sorted for stable output; the client sorts its own copy for prefix lookups
+        'tokens': dict(sorted(tokens.items())),
+        'grams': trigrams,
+    }
+
+
+def write_search_index(circulars, window=(), filename=SEARCH_INDEX_FILE):
+    """Build the index and write it with its compressed copies"""
+    index = build_index(circulars, window)
+    payload = json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    sizes = write_precompressed(filename, payload)
+    print(f"Search index: {len(circulars)} circulars ({len(index['docs']['rows'])} outside the shards), "
+          f"{len(index['tokens'])} tokens, {len(index['grams'])} trigrams, {sizes[filename] / 1024:.1f} KB "
+          f"({sizes[filename + '.gz'] / 1024:.1f} KB gzip)")
+    return index
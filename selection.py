@@ -0,0 +1,42 @@
+"""
+Per-source top-K selection for the published circulars window.
+Records are bucketed by source in one pass, each bucket keeps a bounded
+heap of its newest entries, and the buckets are k-way merged into the
+final window while the per-source counts are taken.
+"""
+
+import heapq
+from itertools import islice
+
+from dates import sort_key
+from sources import SOURCES, source_key_for
+
+
+def select_recent(circulars, per_source=100, total=400):
+    """Newest per_source circulars of each source, merged newest-first and cut to total.
+
+    Returns (selected, source_breakdown). Ties keep the input order within a
+    source and the registry order between sources.
+    """
+    heaps = {source.key: [] for source in SOURCES}
+    for index, circular in enumerate(circulars):
+        key = source_key_for(circular)
+        heap = heaps.get(key)
+        if heap is None:
+            continue
+        # Min-heap of the newest entries; -index keeps earlier records on ties
+        entry = (sort_key(circular), -index, key, circular)
+        if len(heap) < per_source:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    buckets = [sorted(heaps[source.key], reverse=True) for source in SOURCES]
+    merged = heapq.merge(*buckets, key=lambda entry: entry[0], reverse=True)
+
+    selected = []
+    source_breakdown = {source.key: 0 for source in SOURCES}
+    for _, _, key, circular in islice(merged, total):
+        selected.append(circular)
+        source_breakdown[key] += 1
+    return selected, source_breakdown
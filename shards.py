@@ -0,0 +1,103 @@
+"""
+Per-category shards of the published circulars for the frontend.
+The tab classification that script.js used to redo on every load is
+applied once here; each tab then fetches only its own compact
+shards/<key>.min.json, and shards/manifest.json lists the counts,
+content hashes and row layouts (the search index points into the rows).
+"""
+
+import hashlib
+import os
+from datetime import datetime
+
+from atomic_io import write_json
+from circular_store import store_key
+from publish import COMPACT_FORMAT, dumps_compact, write_precompressed
+from sources import SOURCES
+
+SHARD_DIR = 'shards'
+MANIFEST_FILE = 'manifest.json'
+
+DVP_MARKERS = ('ಡಿವಿಪಿ', 'DVP')
+
+
+def has_dvp_number(circular):
+    circular_no = circular.get('circular_no') or ''
+    return any(marker in circular_no for marker in DVP_MARKERS)
+
+
+def classify_category(circular):
+    """Registry keys of the tabs a circular is listed under.
+
+    Mirrors the filters script.js applied to circulars.json: the
+    Departmental tab shows every circular without a DVP number, DVP also
+    picks up DVP numbers and links, EST and ACM go by source URL.
+    """
+    source_url = circular.get('source_url') or ''
+    download_link = circular.get('download_link') or ''
+    dvp_number = has_dvp_number(circular)
+
+    categories = []
+    if not dvp_number:
+        categories.append('departmental')
+    if 'Circulars/DVP' in source_url or dvp_number or '/DVP/' in download_link:
+        categories.append('dvp')
+    if 'Circulars/EST' in source_url:
+        categories.append('est')
+    if 'Circulars/ACM' in source_url:
+        categories.append('acm')
+    return categories
+
+
+def shard_layout(circulars):
+    """Hash of the store keys of a shard's rows in order; equal layouts mean equal row numbers"""
+    digest = hashlib.sha1()
+    for circular in circulars:
+        digest.update((store_key(circular) or '').encode('ascii') + b'\n')
+    return digest.hexdigest()
+
+
+def split_categories(circulars):
+    """{category key: circulars} in registry order, keeping the input order"""
+    shards = {source.key: [] for source in SOURCES}
+    for circular in circulars:
+        for category in classify_category(circular):
+            shards[category].append(circular)
+    return shards
+
+
+def write_shards(data, directory=SHARD_DIR):
+    """Write one compact JSON file per category plus the manifest; returns the manifest"""
+    os.makedirs(directory, exist_ok=True)
+    last_updated = data.get('last_updated')
+
+    entries = {}
+    for key, circulars in split_categories(data.get('circulars', [])).items():
+        payload = dumps_compact({
+            'last_updated': last_updated,
+            'category': key,
+            'total_circulars': len(circulars),
+            'circulars': circulars,
+        })
+
+        filename = f"{key}.min.json"
+        write_precompressed(os.path.join(directory, filename), payload)
+        entries[key] = {
+            'file': filename,
+            'count': len(circulars),
+            'bytes': len(payload),
+            'sha256': hashlib.sha256(payload).hexdigest(),
+            'layout': shard_layout(circulars),
+        }
+
+    manifest = {
+        'generated_at': datetime.now().isoformat(),
+        'last_updated': last_updated,
+        'format': COMPACT_FORMAT,
+        'shards': entries,
+    }
+    write_json(os.path.join(directory, MANIFEST_FILE), manifest)
+
+    print(f"Wrote {len(entries)} shards to {directory}/: "
+          + ', '.join(f"{key} {entry['count']}" for key, entry in entries.items()))
+    return manifest
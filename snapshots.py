@@ -0,0 +1,90 @@
+"""
+Last-known-good snapshots of each source, for merges where a section failed.
+Whenever a merge has fresh data from a source, its records are kept in
+snapshots/<source>.json (rewritten only when they change). A later run
+without fresh data for that source uses its snapshot in place of the
+data file while it is younger than the source's snapshot TTL; only a
+source without a usable snapshot falls back to its baseline rows.
+
+Every published record is labeled with the freshness tier of its source:
+
+    fresh   scraped or revalidated within the source's fresh TTL
+    cached  from the snapshot, within the snapshot TTL
+    stale   only older data: an expired snapshot, the archive or the baseline
+
+The time each source was last fresh is kept in status.json, so the site
+can show how old each section's data is.
+"""
+
+import json
+import os
+from datetime import datetime
+
+from atomic_io import write_json
+from fingerprint import record_fingerprint
+from sources import source_key_for
+
+SNAPSHOT_DIR = 'snapshots'
+
+FRESH = 'fresh'
+CACHED = 'cached'
+STALE = 'stale'
+
+
+def age_hours(timestamp, now=None):
+    """Hours since an ISO timestamp, None if it is missing or unparseable"""
+    try:
+        then = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+    now = now or datetime.now(then.tzinfo)
+    return (now - then).total_seconds() / 3600
+
+
+def label_freshness(circulars, tiers):
+    """Set each record's freshness to the tier of its source; returns circulars"""
+    for circular in circulars:
+        tier = tiers.get(source_key_for(circular))
+        if tier:
+            circular['freshness'] = tier
+    return circulars
+
+
+class SnapshotCache:
+    def __init__(self, directory=SNAPSHOT_DIR):
+        self.directory = directory
+        # Exists even before any section succeeded, so the workflows can always add it
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, source):
+        return os.path.join(self.directory, f"{source}.json")
+
+    def load(self, source):
+        """The snapshot of a source key, or None"""
+        path = self.path(source)
+        try:
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Could not load snapshot {path}: {e}")
+        return None
+
+    def save(self, source, data):
+        """Keep a fresh data file as the snapshot of source unless its records are unchanged"""
+        circulars = data.get('circulars') or []
+        if not circulars:
+            return False
+        previous = self.load(source)
+        if previous is not None and [record_fingerprint(c) for c in previous.get('circulars', [])] \
+                == [record_fingerprint(c) for c in circulars]:
+            return False
+        write_json(self.path(source), {
+            'source': data.get('source', source),
+            'url': data.get('url', ''),
+            'scraped_at': data.get('scraped_at'),
+            'saved_at': datetime.now().isoformat(),
+            'count': len(circulars),
+            'circulars': circulars,
+        })
+        return True
@@ -0,0 +1,109 @@
+"""
+Registry of the DTE Karnataka circular sections.
+Each entry describes a listing page: where the columns are, which rows
+are headers, how links are resolved and filtered. Adding a section only
+needs a new SourceSchema in SOURCES.
+"""
+
+DTE_BASE_URL = "https://dtek.karnataka.gov.in"
+
+# Header row markers found in the date column
+HEADER_TOKENS = ('date', 'ದಿನಾಂಕ')
+
+# Accessibility widgets and script links that share the listing tables
+BLOCKED_LINK_TERMS = ('atoall.com', 'webinsight', 'satogo.com', 'javascript:')
+
+# How long a data file counts as fresh, and how long its last-known-good
+# snapshot may stand in for it once it is not (see snapshots.py)
+FRESH_TTL_HOURS = 4
+SNAPSHOT_TTL_HOURS = 72
+
+
+class SourceSchema:
+    def __init__(self, name, url, layouts, url_marker=None, link_base=DTE_BASE_URL,
+                 header_tokens=HEADER_TOKENS, blocked_link_terms=BLOCKED_LINK_TERMS,
+                 min_description_length=10, fresh_ttl_hours=FRESH_TTL_HOURS,
+                 snapshot_ttl_hours=SNAPSHOT_TTL_HOURS):
+        self.name = name
+        self.key = name.lower()
+        self.url = url
+        self.url_marker = url_marker or name
+        self.link_base = link_base
+        self.header_tokens = frozenset(header_tokens)
+        self.blocked_link_terms = tuple(blocked_link_terms)
+        self.min_description_length = min_description_length
+        self.fresh_ttl_hours = fresh_ttl_hours
+        self.snapshot_ttl_hours = snapshot_ttl_hours
+
+        # layouts: {minimum cell count: (date, circular_no, description) indices}
+        # compiled into a list indexed by cell count so rows need one lookup
+        self.min_cells = min(layouts)
+        self.max_cells = max(layouts)
+        self.column_map = [None] * (self.max_cells + 1)
+        current = None
+        for width in range(self.max_cells + 1):
+            current = layouts.get(width, current)
+            self.column_map[width] = current
+
+    def columns(self, cell_count):
+        """(date, circular_no, description) indices for a row, or None if too short"""
+        return self.column_map[min(cell_count, self.max_cells)]
+
+    def is_header(self, date, description):
+        return date.lower() in self.header_tokens or len(description) < self.min_description_length
+
+    def resolve_link(self, href):
+        """Absolute download link for an href taken from the table"""
+        if href.startswith('/'):
+            return self.link_base + href
+        if href.startswith('http'):
+            return href
+        return ""
+
+    def matches(self, circular):
+        """Whether a stored circular belongs to this source"""
+        source = circular.get('source')
+        if source:
+            return source.lower() == self.key
+        return self.url_marker in circular.get('source_url', '')
+
+
+SOURCES = [
+    # date, circular_no, description (+ download column)
+    SourceSchema('Departmental', f"{DTE_BASE_URL}/info-4/Departmental+Circulars/kn",
+                 layouts={3: (0, 1, 2)}),
+    # serial, date, circular_no, description, download
+    SourceSchema('DVP', f"{DTE_BASE_URL}/page/Circulars/DVP/kn",
+                 layouts={3: (0, 1, 2), 4: (1, 2, 3)}),
+    # date, circular_no, description, empty, action
+    SourceSchema('EST', f"{DTE_BASE_URL}/page/Circulars/EST/kn",
+                 layouts={3: (0, 1, 2)}),
+    SourceSchema('ACM', f"{DTE_BASE_URL}/page/Circulars/ACM-Polytechnic/kn",
+                 layouts={3: (0, 1, 2)}),
+]
+
+SOURCES_BY_KEY = {source.key: source for source in SOURCES}
+
+
+def get_source(name):
+    """Source by name ('DVP', 'dvp'), or None"""
+    return SOURCES_BY_KEY.get(name.lower())
+
+
+def source_for_url(url):
+    """Source whose listing URL (or URL marker) matches url, or None"""
+    for source in SOURCES:
+        if url == source.url:
+            return source
+    for source in SOURCES:
+        if source.url_marker in url:
+            return source
+    return None
+
+
+def source_key_for(circular):
+    """Registry key of a stored circular, or None if it matches no source"""
+    for source in SOURCES:
+        if source.matches(circular):
+            return source.key
+    return None
@@ -0,0 +1,162 @@
+"""
+Streaming newest-first merge of circular files.
+JSONArrayStream decodes the circulars array of a data_<source>.json,
+circulars.json or circulars-baseline.json one record at a time with
+json.JSONDecoder.raw_decode over a fixed-size read buffer, parsing only
+the members before the array (scraped_at, url, ...) into a header.
+merge_newest() k-way merges such newest-first streams through a heap and
+stops after the requested number of distinct records, so memory and time
+grow with that number, not with the size of the files.
+"""
+
+import heapq
+import json
+import re
+
+from dates import sort_key
+from dedup import dedup_key
+
+# Characters read per refill; a record larger than this just takes several reads
+CHUNK_SIZE = 1 << 16
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+DECODER = json.JSONDecoder()
+
+
+class UnsortedInput(ValueError):
+    """A stream is not newest-first, so a streaming merge of it would be wrong"""
+
+
+class JSONArrayStream:
+    """Records of one array member of a top-level JSON object, decoded incrementally.
+
+    Use as a context manager; header holds the members that precede the array
+    and is complete once the stream is open.
+    """
+
+    def __init__(self, path, key='circulars', chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.key = key
+        self.chunk_size = chunk_size
+        self.header = {}
+        self.records_read = 0
+        self.file = None
+        self.buffer = ''
+        self.pos = 0
+        self.found = False
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self):
+        self.file = open(self.path, 'r', encoding='utf-8')
+        self._expect('{')
+        if self._peek() == '}':
+            return self
+        while True:
+            name = self._value()
+            self._expect(':')
+            if name == self.key and self._peek() == '[':
+                self.pos += 1
+                self.found = True
+                return self
+            self.header[name] = self._value()
+            if self._separator('}'):
+                return self
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __iter__(self):
+        if not self.found or self._peek() == ']':
+            return
+        while True:
+            record = self._value()
+            self.records_read += 1
+            yield record
+            if self._separator(']'):
+                return
+
+    def _fill(self):
+        """Append a chunk, dropping what was consumed; False at end of file"""
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        """Next non-whitespace character without consuming it, '' at end of file"""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"{self.path}: expected {char!r}, found {found!r}")
+        self.pos += 1
+
+    def _separator(self, close):
+        """Consume ',' or close; True if it was close"""
+        found = self._peek()
+        if found not in (',', close):
+            raise ValueError(f"{self.path}: expected ',' or {close!r}, found {found!r}")
+        self.pos += 1
+        return found == close
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Value cut off by the end of the buffer
+                if not self._fill():
+                    raise
+                continue
+            # A number at the very end of the buffer may go on in the next chunk
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def newest_first(circulars, label):
+    """Pass circulars through, raising UnsortedInput at the first one newer than its predecessor"""
+    previous = None
+    for circular in circulars:
+        key = sort_key(circular)
+        if previous is not None and key > previous:
+            raise UnsortedInput(f"{label} is not newest-first ({key} after {previous})")
+        previous = key
+        yield circular
+
+
+def merge_newest(streams, limit):
+    """The newest limit distinct circulars of newest-first streams, newest first.
+
+    Records are distinct by dedup_key(); for equal dates an earlier stream wins,
+    so fresh data goes first and the baseline last. Holds one pending record per
+    stream and the keys of the records yielded so far.
+    """
+    seen = set()
+    if limit <= 0:
+        return
+    for circular in heapq.merge(*streams, key=sort_key, reverse=True):
+        key = dedup_key(circular)
+        if key is None or key in seen:
+            continue
+        seen.add(key)
+        yield circular
+        if len(seen) >= limit:
+            return
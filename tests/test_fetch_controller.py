@@ -0,0 +1,49 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fetch_controller import FetchController
+
+SECTIONS = [
+    'https://dtek.karnataka.gov.in/page/Circulars/Departmental/kn',
+    'https://dtek.karnataka.gov.in/page/Circulars/EST/kn',
+    'https://dtek.karnataka.gov.in/page/Circulars/ACM-Polytechnic/kn',
+    'https://dtek.karnataka.gov.in/page/Circulars/DVP/kn',
+]
+
+
+def peak_concurrency(controller, urls):
+    """Most requests held at once when every URL is fetched in its own worker"""
+    lock = threading.Lock()
+    state = {'active': 0, 'peak': 0}
+
+    def fetch(url):
+        with controller.host_slot(url):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.05)
+            with lock:
+                state['active'] -= 1
+
+    with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+        list(executor.map(fetch, urls))
+    return state['peak']
+
+
+def test_default_limit_binds_for_the_scraper_sections(tmp_path):
+    controller = FetchController('test', state_dir=str(tmp_path))
+    assert controller.per_host_limit < len(SECTIONS)
+    assert peak_concurrency(controller, SECTIONS) == controller.per_host_limit
+
+
+def test_cap_holds_with_more_workers_than_the_limit(tmp_path):
+    controller = FetchController('test', state_dir=str(tmp_path), per_host_limit=3)
+    urls = [f"{SECTIONS[0]}?page={page}" for page in range(12)]
+    assert peak_concurrency(controller, urls) == 3
+
+
+def test_hosts_are_capped_separately(tmp_path):
+    controller = FetchController('test', state_dir=str(tmp_path), per_host_limit=1)
+    urls = ['https://a.example/one', 'https://a.example/two', 'https://b.example/one', 'https://b.example/two']
+    assert peak_concurrency(controller, urls) == 2
@@ -0,0 +1,121 @@
+import glob
+import hashlib
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from pdf_mirror import PDFMirror
+
+BODY = b'%PDF-1.4\n' + bytes(range(256)) * 400 + b'\n%%EOF\n'
+
+
+class PDFHandler(BaseHTTPRequestHandler):
+    """Serves server.files; honours Range unless server.honour_range is False"""
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, self.headers.get('Range')))
+        body = server.files.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        match = re.match(r'bytes=(\d+)-$', self.headers.get('Range') or '')
+        if match and server.honour_range:
+            start = int(match.group(1))
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(body)}")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{len(body) - 1}/{len(body)}")
+            body = body[start:]
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/pdf')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), PDFHandler)
+    httpd.files = {}
+    httpd.honour_range = True
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.base_url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    session = requests.Session()
+    # Keep proxy settings from the environment away from the local server
+    session.trust_env = False
+    return PDFMirror(cache_dir=str(tmp_path / 'pdf_cache'), session=session)
+
+
+def write_partial(mirror, url, data):
+    os.makedirs(mirror.partial_dir, exist_ok=True)
+    with open(mirror.partial_path(url), 'wb') as f:
+        f.write(data)
+
+
+def read_object(mirror, sha256):
+    with open(mirror.object_path(sha256), 'rb') as f:
+        return f.read()
+
+
+def test_resumes_partial_download_with_range(server, mirror):
+    server.files['/a.pdf'] = BODY
+    url = server.base_url + '/a.pdf'
+    write_partial(mirror, url, BODY[:1000])
+
+    entry = mirror.download(url)
+
+    assert server.requests == [('/a.pdf', 'bytes=1000-')]
+    assert entry['sha256'] == hashlib.sha256(BODY).hexdigest()
+    assert entry['size'] == len(BODY)
+    assert read_object(mirror, entry['sha256']) == BODY
+    assert not os.path.exists(mirror.partial_path(url))
+
+
+def test_restarts_when_server_ignores_range(server, mirror):
+    server.files['/a.pdf'] = BODY
+    server.honour_range = False
+    url = server.base_url + '/a.pdf'
+    write_partial(mirror, url, BODY[:1000])
+
+    entry = mirror.download(url)
+
+    # The 200 body replaces the partial file instead of being appended to it
+    assert server.requests == [('/a.pdf', 'bytes=1000-')]
+    assert entry['size'] == len(BODY)
+    assert read_object(mirror, entry['sha256']) == BODY
+
+
+def test_identical_files_are_stored_once(server, mirror):
+    server.files['/one.pdf'] = BODY
+    server.files['/two.pdf'] = BODY
+    circulars = [{'download_link': server.base_url + '/one.pdf'},
+                 {'download_link': server.base_url + '/two.pdf'}]
+
+    stats = mirror.mirror(circulars)
+
+    assert stats['downloaded'] == 2
+    assert stats['deduplicated'] == 1
+    assert stats['annotated'] == 2
+    assert circulars[0]['pdf_sha256'] == circulars[1]['pdf_sha256'] == hashlib.sha256(BODY).hexdigest()
+    assert len(glob.glob(os.path.join(mirror.objects_dir, '*', '*.pdf'))) == 1
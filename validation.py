@@ -0,0 +1,96 @@
+"""
+Single validation engine for scraped circular rows.
+All blocked link terms, circular numbers and description phrases are
+compiled once into regular expressions; every rejected row is counted
+under a reason so filter hit rates can be reported.
+"""
+
+import re
+import threading
+import time
+from collections import Counter
+
+from sources import SOURCES
+
+BLOCKED_CIRCULAR_NOS = ('atoall', 'webanywhere', 'system access to go')
+
+BLOCKED_DESCRIPTION_TERMS = (
+    'external website that opens in a new window',
+    'javascript:',
+    'webanywhere',
+    'system access',
+    'atoall.com',
+    'webinsight',
+)
+
+
+def compile_terms(terms, whole=False):
+    """Case-insensitive alternation of literal terms, longest first"""
+    alternation = '|'.join(re.escape(term) for term in sorted(set(terms), key=len, reverse=True))
+    if whole:
+        alternation = f"(?:{alternation})"
+    return re.compile(alternation, re.IGNORECASE)
+
+
+class CircularValidator:
+    def __init__(self, blocked_link_terms=None, blocked_circular_nos=BLOCKED_CIRCULAR_NOS,
+                 blocked_description_terms=BLOCKED_DESCRIPTION_TERMS):
+        if blocked_link_terms is None:
+            blocked_link_terms = [term for source in SOURCES for term in source.blocked_link_terms]
+        self.link_pattern = compile_terms(blocked_link_terms)
+        self.circular_no_pattern = compile_terms(blocked_circular_nos, whole=True)
+        self.description_pattern = compile_terms(blocked_description_terms)
+
+        self.accepted = 0
+        self.rejections = Counter()
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def check(self, date, circular_no, description, download_link=''):
+        """Reason the row should be dropped, or None if it is a valid circular"""
+        if download_link and self.link_pattern.search(download_link):
+            return 'blocked_link'
+        if circular_no and self.circular_no_pattern.fullmatch(circular_no):
+            return 'blocked_circular_no'
+        if description and self.description_pattern.search(description):
+            return 'blocked_description'
+        # Must have a meaningful date (single digit day/month allowed)
+        if not date or len(date.strip()) <= 4:
+            return 'missing_date'
+        if not description or len(description.strip()) < 5:
+            return 'short_description'
+        return None
+
+    def is_valid(self, date, circular_no, description, download_link=''):
+        """check() with counting"""
+        started = time.perf_counter()
+        reason = self.check(date, circular_no, description, download_link)
+        with self._lock:
+            self.elapsed += time.perf_counter() - started
+            if reason:
+                self.rejections[reason] += 1
+            else:
+                self.accepted += 1
+        return reason is None
+
+    def is_blocked_href(self, href):
+        """Link filter for the row parsers, counted as 'blocked_href'"""
+        if self.link_pattern.search(href):
+            with self._lock:
+                self.rejections['blocked_href'] += 1
+            return True
+        return False
+
+    def stats(self):
+        return {
+            'accepted': self.accepted,
+            'rejected': sum(self.rejections.values()),
+            'reasons': dict(self.rejections),
+            'elapsed_ms': round(self.elapsed * 1000, 3),
+        }
+
+    def report(self):
+        stats = self.stats()
+        reasons = ', '.join(f"{reason}: {count}" for reason, count in self.rejections.most_common())
+        print(f"Validation: {stats['accepted']} accepted, {stats['rejected']} rejected"
+              f"{f' ({reasons})' if reasons else ''} in {stats['elapsed_ms']:.1f}ms")